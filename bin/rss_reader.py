@@ -1,16 +1,66 @@
 import argparse
 import logging
 import os
+import random
 import re
+import shutil
 import subprocess
-import tempfile
 import time
 from collections import defaultdict
-from typing import Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from typing import Any, Optional
 
 import yaml
 from reader import make_reader
 
+try:
+    # the loader of libyaml, when PyYAML is built with it.
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+RULE_GROUP_PREFIX = "rule_"
+DEFAULT_BATCH_SIZE = 50
+MAX_FEED_WORKERS = 16
+BACKOFF_FACTOR = 1.5
+BACKOFF_MAX_FACTOR = 4
+BACKOFF_JITTER = 0.1
+
+
+def compile_url_router(rules: list[dict[str, Any]]) -> Optional[re.Pattern]:
+    """
+    Combine `url_pattern` of rules into a single pattern so that a URL is
+    routed with one match instead of one search per rule.
+
+    Each rule becomes a lookahead followed by an empty group named
+    `rule_<index>`. The alternatives are tried in the order of rules, so the
+    first rule that matches anywhere in the URL wins, as it does when the
+    rules are searched one by one. The index of the rule is the name of
+    `Match.lastgroup`.
+
+    Returns None when the patterns cannot be combined, e.g., a pattern has
+    global inline flags, duplicated group names, or numbered
+    backreferences. The caller should search the rules one by one.
+    """
+    if not rules:
+        return None
+    alternatives = []
+    for i, rule in enumerate(rules):
+        pattern = rule["url_pattern"]
+        # group numbers are shifted in the combined pattern.
+        if re.search(r"\\[1-9]", pattern):
+            return None
+        # (?s:) lets the prefix skip any character without changing the
+        # meaning of "." in the pattern.
+        alternatives.append(
+            f"(?=(?s:.*?)(?:{pattern}))(?P<{RULE_GROUP_PREFIX}{i}>)"
+        )
+    try:
+        return re.compile("|".join(alternatives))
+    except re.error:
+        return None
+
 
 def group_urls_to_commands(
     unread_urls: list[str],
@@ -19,43 +69,121 @@ def group_urls_to_commands(
     rules = config.get("rules", [])
     rule_matches = defaultdict(list)
 
-    for url in unread_urls:
-        for i, rule in enumerate(rules):
-            if re.search(rule["url_pattern"], url):
+    # rules loaded with load_rss_config() have compiled patterns. compile
+    # the rest here, once per rule instead of once per URL.
+    router = config.get("url_router") or compile_url_router(rules)
+    patterns = (
+        []
+        if router is not None
+        else [
+            rule.get("url_regexp") or re.compile(rule["url_pattern"])
+            for rule in rules
+        ]
+    )
+    # feeds may have the same link in multiple entries. match a URL only
+    # once, keeping the order.
+    for url in dict.fromkeys(unread_urls):
+        if router is not None:
+            m = router.match(url)
+            if m:
+                i = int(m.lastgroup.removeprefix(RULE_GROUP_PREFIX))
+                rule_matches[i].append(url)
+            continue
+
+        for i, pattern in enumerate(patterns):
+            if pattern.search(url):
                 rule_matches[i].append(url)
                 break
 
+    # split URLs of a rule into batches of `batch_size` so that a command
+    # line, and a crawl, is bounded.
     commands = []
     for i, urls in rule_matches.items():
         rule = rules[i]
-        spider = rule.get("spider_name", "read-more")
-        cmd = ["scrapy", "crawl", spider]
-        cmd.extend(["-a", f"urls={','.join(urls)}"])
-
-        for arg in rule.get("args", []):
-            cmd.extend(["-a", arg])
-        commands.append(cmd)
+        prefix = rule.get("cmd_prefix") or build_command_prefix(rule)
+        batch_size = rule.get("batch_size", DEFAULT_BATCH_SIZE)
+        for start in range(0, len(urls), batch_size):
+            batch = urls[start : start + batch_size]
+            # a new list, as callers extend the command.
+            commands.append(prefix + ["-a", f"urls={','.join(batch)}"])
     return commands
 
 
+def build_command_prefix(rule: dict[str, Any]) -> list[str]:
+    """
+    Returns the part of a spider command that is the same for all the
+    batches of the rule, i.e., everything but the urls argument.
+    """
+    cmd = ["scrapy", "crawl", rule.get("spider_name", "read-more")]
+    for arg in rule.get("args", []):
+        cmd.extend(["-a", arg])
+    return cmd
+
+
 def run_spider(cmd):
     if cmd is None:
         return
     subprocess.run(cmd)
 
 
+def run_spiders(commands: list[list[str]], max_workers: int):
+    """
+    Run spiders in parallel. Each spider runs in its own process, and a
+    thread waits for the process. An exception in one spider is logged and
+    does not stop others.
+    """
+    logger = logging.getLogger("rss_reader")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(run_spider, cmd) for cmd in commands]
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error(e)
+
+
 def update_feeds_with_feed_spider(loglevel: str):
     cmd = ["scrapy", "crawl", f"--loglevel={loglevel.upper()}", "feed"]
     run_spider(cmd)
 
 
+def compile_rules(config: dict[str, Any]) -> dict[str, Any]:
+    """
+    Compile `url_pattern` of each rule and store the compiled pattern in
+    `url_regexp` of the rule. The combined pattern of all the rules is stored
+    in `url_router` of the config. See compile_url_router().
+
+    The command prefix of the rule is stored in `cmd_prefix` of the rule.
+    See build_command_prefix().
+
+    Raises ValueError when `batch_size` of a rule is not a positive integer.
+    """
+    rules = config.get("rules", [])
+    for i, rule in enumerate(rules):
+        batch_size = rule.get("batch_size", DEFAULT_BATCH_SIZE)
+        # bool is an int, but `batch_size: true` is a mistake.
+        if (
+            not isinstance(batch_size, int)
+            or isinstance(batch_size, bool)
+            or batch_size < 1
+        ):
+            raise ValueError(
+                "batch_size must be a positive integer: "
+                f"{batch_size!r} in rule {rule.get('name', i)!r}"
+            )
+        rule["url_regexp"] = re.compile(rule["url_pattern"])
+        rule["cmd_prefix"] = build_command_prefix(rule)
+    config["url_router"] = compile_url_router(rules)
+    return config
+
+
 def load_rss_config(path):
     with open(path, "r") as f:
-        config = yaml.safe_load(f)
-    return config
+        config = yaml.load(f, Loader=SafeLoader)
+    return compile_rules(config)
 
 
-def parse_args():
+def parse_args(argv: Optional[list[str]] = None):
     parser = argparse.ArgumentParser(
         description="Simple RSS reader for rokujo-collector-scrapy"
     )
@@ -66,7 +194,11 @@ def parse_args():
         help="Path to RSS feed configuration file",
     )
     parser.add_argument(
-        "-i", "--interval", default=15, help="Update interval in minutes"
+        "-i",
+        "--interval",
+        type=float,
+        default=15,
+        help="Update interval in minutes",
     )
     parser.add_argument(
         "-d",
@@ -77,14 +209,22 @@ def parse_args():
     parser.add_argument(
         "-o", "--output", default="rss.jsonl", help="Path to output JSONL file"
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=4,
+        help="Max number of spiders to run in parallel",
+    )
     parser.add_argument(
         "-l",
         "--loglevel",
+        type=str.upper,
         default="info",
         choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
         help="Log level, one of choices in upper case or lower case",
     )
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 
 def filename_with_unix_timestamp(path: str) -> str:
@@ -93,12 +233,45 @@ def filename_with_unix_timestamp(path: str) -> str:
     return f"{base}-{unix_timestamp}{ext}"
 
 
-def create_tmp_file(target_path: str) -> str:
-    directory = os.path.dirname(os.path.abspath(target_path))
-    _base, ext = os.path.splitext(target_path)
-    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=f".tmp{ext}")
-    os.close(fd)
-    return tmp_path
+def tmp_file_name(target_path: str, index: int) -> str:
+    """
+    Returns the path of a temporary file for `target_path`, without creating
+    it. The extension of `target_path` is kept at the end so that scrapy can
+    guess the feed format from the file name.
+    """
+    base, ext = os.path.splitext(target_path)
+    return f"{base}-{index}.tmp{ext}"
+
+
+def publish_files(parts: list[str], path: str) -> bool:
+    """
+    Concatenate the output files of spiders into `path`. `path` is created
+    only when the concatenated content is not empty. The parts are removed.
+
+    Returns True when `path` is created.
+    """
+    # a spider that fails to start does not create its file.
+    parts = [part for part in parts if os.path.exists(part)]
+    if not parts:
+        return False
+    try:
+        with open(parts[0], "ab") as out:
+            for part in parts[1:]:
+                with open(part, "rb") as f:
+                    shutil.copyfileobj(f, out)
+            out.flush()
+            size = os.fstat(out.fileno()).st_size
+        if size > 0:
+            # os.replace() atomically replaces the target on all platforms.
+            os.replace(parts[0], path)
+            return True
+        return False
+    finally:
+        for part in parts:
+            try:
+                os.remove(part)
+            except FileNotFoundError:
+                pass
 
 
 def create_logger(log_level: str):
@@ -116,6 +289,62 @@ def update_feed_urls(reader, urls: list[str]):
         reader.add_feed(url, exist_ok=True)
 
 
+def next_interval(
+    current: float,
+    base: float,
+    has_entries: bool,
+) -> float:
+    """
+    Returns the next interval in seconds.
+
+    When new entries are found, the interval is reset to `base`. Otherwise,
+    the current interval is multiplied by BACKOFF_FACTOR, up to
+    `base * BACKOFF_MAX_FACTOR`.
+    """
+    if has_entries:
+        return base
+    return min(base * BACKOFF_MAX_FACTOR, current * BACKOFF_FACTOR)
+
+
+def with_jitter(interval: float) -> float:
+    """
+    Returns the interval with random jitter of +/- BACKOFF_JITTER.
+    """
+    return interval * random.uniform(1 - BACKOFF_JITTER, 1 + BACKOFF_JITTER)
+
+
+def get_unread_entries(reader) -> tuple[list[tuple[str, str]], list[str]]:
+    """
+    Iterate unread entries once, without keeping Entry objects.
+
+    Returns a tuple of (feed URL, entry id) tuples of all unread entries, and
+    links of the entries that have one.
+    """
+    entry_ids = []
+    links = []
+    for entry in reader.get_entries(read=False):
+        entry_ids.append((entry.feed_url, entry.id))
+        if entry.link:
+            links.append(entry.link)
+    return entry_ids, links
+
+
+def mark_entries_as_read(reader, entry_ids: list[tuple[str, str]]) -> None:
+    """
+    Mark entries as read in one place, after all the spiders have finished.
+
+    Entries are given as (feed URL, entry id) tuples. All the entries share
+    the same read_modified time.
+
+    reader does not provide a bulk API to mark multiple entries in a single
+    statement. Each entry is marked with reader.set_entry_read() on the same
+    database connection.
+    """
+    modified = datetime.now(timezone.utc)
+    for entry_id in entry_ids:
+        reader.set_entry_read(entry_id, True, modified)
+
+
 if __name__ == "__main__":
     args = parse_args()
     logger = create_logger(args.loglevel)
@@ -126,9 +355,15 @@ if __name__ == "__main__":
         feed_root="",
     )
 
-    logger.info(f"Starting RSS monitor. Interval: {args.interval} min.")
+    logger.info("Starting RSS monitor. Interval: %s min.", args.interval)
+    base_interval = args.interval * 60
+    interval = base_interval
+    feed_urls = rss_config.get("feed_urls")
+    # feeds are fetched in parallel, one worker per feed up to
+    # MAX_FEED_WORKERS.
+    feed_workers = max(1, min(MAX_FEED_WORKERS, len(feed_urls)))
     while True:
-        update_feed_urls(reader, rss_config.get("feed_urls"))
+        update_feed_urls(reader, feed_urls)
 
         try:
             update_feeds_with_feed_spider(loglevel=args.loglevel)
@@ -136,41 +371,35 @@ if __name__ == "__main__":
             logger.error(e)
 
         logger.info("Checking for new entries...")
-        reader.update_feeds()
-        unread_entries = list(reader.get_entries(read=False))
-        if unread_entries:
-            urls_to_process = [
-                entry.link for entry in unread_entries if entry.link
-            ]
-            logger.info(f"Found {len(urls_to_process)} unread entries.")
+        reader.update_feeds(workers=feed_workers)
+        entry_ids, urls_to_process = get_unread_entries(reader)
+        if entry_ids:
+            logger.info("Found %d unread entries.", len(urls_to_process))
             file = filename_with_unix_timestamp(args.output)
-            logger.debug(f"Adding entries to {file}")
-            tmp_file = create_tmp_file(file)
-            logger.debug(f"tmp_file: {tmp_file}")
-            for cmd in group_urls_to_commands(urls_to_process, rss_config):
-                cmd.extend(["-o", tmp_file])
+            logger.debug("Adding entries to %s", file)
+            commands = group_urls_to_commands(urls_to_process, rss_config)
+            # spiders run in parallel. each spider writes to its own file.
+            tmp_files = []
+            for i, cmd in enumerate(commands):
+                tmp_file = tmp_file_name(file, i)
+                logger.debug("tmp_file: %s", tmp_file)
+                tmp_files.append(tmp_file)
+                # -O overwrites a stale file, if any, instead of appending.
+                cmd.extend(["-O", tmp_file])
                 cmd.extend(["--loglevel", args.loglevel.upper()])
-                try:
-                    run_spider(cmd)
-                except Exception as e:
-                    logger.error(e)
-            logger.debug(f"Moving {tmp_file} to {file}")
+            run_spiders(commands, args.workers)
+            logger.debug("Moving %s to %s", tmp_files, file)
             try:
-                if (
-                    os.path.exists(tmp_file)
-                    and os.path.getsize(tmp_file) > 0
-                ):
-                    os.rename(tmp_file, file)
+                publish_files(tmp_files, file)
             except Exception as e:
                 logger.error(e)
-            finally:
-                if os.path.exists(tmp_file):
-                    os.remove(tmp_file)
 
-            for entry in unread_entries:
-                reader.mark_entry_as_read(entry)
+            mark_entries_as_read(reader, entry_ids)
         else:
             logger.info("No new unread entries.")
 
-        logger.info(f"Sleeping for {args.interval} minutes...")
-        time.sleep(args.interval * 60)
+        interval = next_interval(
+            interval, base_interval, bool(entry_ids)
+        )
+        logger.info("Sleeping for %.1f minutes...", interval / 60)
+        time.sleep(with_jitter(interval))
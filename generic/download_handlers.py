@@ -0,0 +1,93 @@
+import time
+
+from curl_cffi.requests import AsyncSession
+from scrapy.crawler import Crawler
+from scrapy.http.headers import Headers
+from scrapy.http.request import Request
+from scrapy.http.response import Response
+from scrapy.responsetypes import responsetypes
+from scrapy_impersonate import ImpersonateDownloadHandler
+from scrapy_impersonate.parser import CurlOptionsParser, RequestParser
+
+
+class PersistentImpersonateDownloadHandler(ImpersonateDownloadHandler):
+    """
+    ImpersonateDownloadHandler that keeps its sessions open between requests.
+
+    ImpersonateDownloadHandler creates a session per request, and closes its
+    connection after the response. Every request pays a TCP and TLS
+    handshake, even when the spider requests many pages of the same host.
+
+    This handler keeps a session per set of curl options, e.g., proxy
+    credentials, so that libcurl can reuse a kept-alive connection to a host
+    for the following requests. The browser to impersonate is still chosen
+    per request. Cookies are not kept in the sessions. They are handled by
+    scrapy as before.
+
+    The sessions are closed when the handler is closed.
+    """
+
+    def __init__(self, crawler: Crawler) -> None:
+        super().__init__(crawler)
+        self.max_clients = crawler.settings.getint("CONCURRENT_REQUESTS")
+        self.sessions: dict[str, AsyncSession] = {}
+
+    def get_session(self, curl_options: dict) -> AsyncSession:
+        """
+        Returns the session for `curl_options`. A session is created on the
+        first request with the options.
+        """
+        key = repr(sorted(curl_options.items()))
+        session = self.sessions.get(key)
+        if session is None:
+            session = AsyncSession(
+                max_clients=self.max_clients,
+                curl_options=curl_options,
+                discard_cookies=True,
+            )
+            self.sessions[key] = session
+        return session
+
+    async def _download_request(self, request: Request) -> Response:
+        # same as ImpersonateDownloadHandler, but with a shared session.
+        request_copy = request.copy()
+        curl_options = CurlOptionsParser(request_copy).as_dict()
+        client = self.get_session(curl_options)
+
+        request_args = RequestParser(request_copy).as_dict()
+        start_time = time.time()
+        response = await client.request(**request_args)
+        download_latency = time.time() - start_time
+
+        headers = Headers(response.headers.multi_items())
+        headers.pop("Content-Encoding", None)
+
+        respcls = responsetypes.from_args(
+            headers=headers,
+            url=response.url,
+            body=response.content,
+        )
+
+        resp = respcls(
+            url=response.url,
+            status=response.status_code,
+            headers=headers,
+            body=response.content,
+            flags=["impersonate"],
+            request=request,
+        )
+
+        resp.meta["download_latency"] = download_latency
+        return resp
+
+    async def close_sessions(self) -> None:
+        """
+        Close all the sessions.
+        """
+        sessions, self.sessions = self.sessions, {}
+        for session in sessions.values():
+            await session.close()
+
+    async def close(self) -> None:
+        await self.close_sessions()
+        await super().close()
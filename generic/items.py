@@ -9,11 +9,21 @@ from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Self
 
 import scrapy
-from scrapy.http import Response
-from scrapy.selector import Selector
-from trafilatura import extract
+from lxml import etree
+from scrapy.http import HtmlResponse, Response
 
-from generic.utils import count_xml_character, get_metadata
+from generic.utils import (
+    XML_PARSER,
+    count_element_character,
+    get_metadata,
+)
+
+# plain strings, not _ElementUnicodeResult that keeps its parent element.
+_JSON_LD_XPATH = etree.XPath(
+    '//script[@type="application/ld+json"]/text()', smart_strings=False
+)
+JSON_LD_ARTICLE_TYPES = frozenset(["Article", "NewsArticle", "BlogPosting"])
+""" Schema.org types that get_json_ld() prefers. """
 
 
 class FileItem(scrapy.Item):
@@ -86,18 +96,34 @@ class ArticleItem:
 
     @staticmethod
     def get_json_ld(res: Response) -> Dict[str, Any]:
-        """Extracts and parses JSON-LD from the response."""
-        raw_json = res.xpath(
-            '//script[@type="application/ld+json"]/text()'
-        ).get()
-        if not raw_json:
-            return {}
-        try:
-            data = json.loads(raw_json)
-            # return the first item when data is a list and ignore others.
-            return data[0] if isinstance(data, list) else data
-        except (json.JSONDecodeError, IndexError):
-            return {}
+        """
+        Extracts and parses JSON-LD from the response.
+
+        A page may have multiple JSON-LD blocks, and a block may be a list.
+        Returns the first object whose ``@type`` is one of
+        ``JSON_LD_ARTICLE_TYPES``. When none is found, returns the first
+        object. Returns an empty dict when the response has no parsable
+        JSON-LD.
+        """
+        first = None
+        for raw_json in _JSON_LD_XPATH(res.selector.root):
+            # some CMSs emit empty blocks. skip them without raising.
+            if not raw_json.strip():
+                continue
+            try:
+                data = json.loads(raw_json)
+            except json.JSONDecodeError:
+                continue
+            for obj in data if isinstance(data, list) else [data]:
+                if not isinstance(obj, dict):
+                    continue
+                kind = obj.get("@type")
+                kinds = kind if isinstance(kind, list) else [kind]
+                if any(k in JSON_LD_ARTICLE_TYPES for k in kinds):
+                    return obj
+                if first is None:
+                    first = obj
+        return first or {}
 
     @classmethod
     def from_response(cls, res: Response) -> Self:
@@ -112,11 +138,58 @@ class ArticleItem:
         Returns:
             Self: An instance of ArticleItem or its subclass.
         """
+        item, _main = cls._from_response_with_main(res)
+        return item
 
+    @classmethod
+    def _from_response_with_main(
+        cls, res: Response
+    ) -> tuple[Self, etree._Element]:
+        """
+        Same as from_response(), but also returns the ``<main>`` element of
+        the body, so that callers can reuse the tree without parsing the
+        body again.
+        """
         acquired_time = datetime.now(timezone.utc).isoformat()
         metadata = get_metadata(res)
+        main = cls._extract_main(res, metadata)
+        body = etree.tostring(main, encoding="unicode", with_tail=False)
+        character_count = count_element_character(main)
+
+        item = cls(
+            url=metadata["url"],
+            title=metadata["title"],
+            lang=metadata["lang"],
+            author=metadata["author"],
+            body=body,
+            character_count=character_count,
+            kind=metadata["kind"],
+            site_name=metadata["site_name"],
+            description=metadata["description"],
+            acquired_time=acquired_time,
+            published_time=metadata["published_time"],
+            modified_time=metadata["modified_time"],
+        )
+        return item, main
+
+    @staticmethod
+    def _extract_main(res: Response, metadata: dict) -> etree._Element:
+        """
+        Extract the content of the response with trafilatura, and returns
+        the ``<main>`` element of the extracted XML. The body is not
+        serialized, see _from_response_with_main().
+
+        Args:
+            res: scrapy.http.Response.
+            metadata: The metadata of `res`, see get_metadata().
+        """
+        # trafilatura is loaded by spiders that create ArticleItem only.
+        from trafilatura import extract
+
+        # pass the tree that scrapy has already parsed. trafilatura copies
+        # the tree before modifying it.
         extracted = extract(
-            res.text,
+            res.selector.root,
             url=metadata["url"],
             with_metadata=True,
             target_language=metadata["lang"],
@@ -129,31 +202,19 @@ class ArticleItem:
                 f"URL: {res.url}\n"
             )
 
-        xml_sel = Selector(text=extracted)
-        body = xml_sel.xpath("//doc/main").get()
-        if body is None:
+        # the XML has a single <doc> root. read <main> directly from the
+        # root instead of running XPath on an HTML reparse of the XML.
+        main = etree.fromstring(
+            extracted.encode("utf-8"), XML_PARSER
+        ).find("main")
+        if main is None:
             raise ValueError(
                 (
                     f"trafilatura XML does not contain //doc/main\n"
                     f"URL: {res.url}"
                 )
             )
-        character_count = count_xml_character(body)
-
-        return cls(
-            url=metadata["url"],
-            title=metadata["title"],
-            lang=metadata["lang"],
-            author=metadata["author"],
-            body=body,
-            character_count=character_count,
-            kind=metadata["kind"],
-            site_name=metadata["site_name"],
-            description=metadata["description"],
-            acquired_time=acquired_time,
-            published_time=metadata["published_time"],
-            modified_time=metadata["modified_time"],
-        )
+        return main
 
 
 @dataclass
@@ -176,3 +237,21 @@ class FeedItem:
     """
     The time in ISO 8601 format in which the feed was generated.
     """
+
+
+def article_item_from_body(
+    url: str,
+    body: bytes,
+    encoding: str,
+) -> ArticleItem:
+    """
+    Create an ArticleItem from the URL, the body, and the encoding of a
+    response, instead of the response itself.
+
+    The function is defined at module level so that it can be submitted to a
+    process pool. Only the arguments are sent to the worker, and the
+    ArticleItem is sent back.
+    """
+    return ArticleItem.from_response(
+        HtmlResponse(url=url, body=body, encoding=encoding)
+    )
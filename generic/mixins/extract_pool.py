@@ -0,0 +1,79 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import scrapy
+from scrapy import signals
+from scrapy.utils.reactor import is_asyncio_reactor_installed
+
+from generic.items import ArticleItem, article_item_from_body
+
+
+class ExtractPoolMixin:
+    """
+    Provides extraction of articles in a process pool.
+
+    Extracting an article with trafilatura is CPU-bound, and blocks the
+    reactor while it runs. When `EXTRACT_IN_POOL` setting is True, articles
+    are extracted in worker processes, so that multiple articles are
+    extracted in parallel while the reactor keeps downloading.
+
+    `EXTRACT_POOL_WORKERS` is the number of the workers. When it is 0, the
+    number of CPUs is used.
+
+    The pool requires the asyncio reactor, the default of scrapy. With other
+    reactors, or when `EXTRACT_IN_POOL` is False, articles are extracted in
+    the spider process as usual.
+
+    Callbacks should be coroutines, or asynchronous generators, that await
+    article_item_from_response().
+    """
+
+    _extract_pool: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        if not crawler.settings.getbool("EXTRACT_IN_POOL"):
+            return spider
+
+        if not is_asyncio_reactor_installed():
+            spider.logger.warning(
+                "EXTRACT_IN_POOL requires the asyncio reactor. "
+                "Articles are extracted in the spider process."
+            )
+            return spider
+
+        workers = crawler.settings.getint("EXTRACT_POOL_WORKERS") or None
+        # forkserver starts workers from a clean process, not a fork of the
+        # running reactor.
+        spider._extract_pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+        crawler.signals.connect(
+            spider._close_extract_pool, signal=signals.spider_closed
+        )
+        return spider
+
+    def _close_extract_pool(self):
+        if self._extract_pool is not None:
+            self._extract_pool.shutdown()
+            self._extract_pool = None
+
+    async def article_item_from_response(
+        self,
+        res: scrapy.http.Response,
+    ) -> ArticleItem:
+        """
+        Create an ArticleItem from the response, in the process pool when it
+        is enabled. See ArticleItem.from_response().
+        """
+        if self._extract_pool is None:
+            return ArticleItem.from_response(res)
+
+        future = self._extract_pool.submit(
+            article_item_from_body, res.url, res.body, res.encoding
+        )
+        return await asyncio.wrap_future(future)
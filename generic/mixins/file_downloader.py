@@ -1,4 +1,6 @@
+import re
 from datetime import datetime, timezone
+from functools import cached_property
 from os.path import basename
 from urllib.parse import unquote, urlparse
 
@@ -7,6 +9,7 @@ import scrapy
 from generic.items import FileItem
 from generic.spiders.base import GenericSpiderConfig
 from generic.utils import (
+    get_absolute_url,
     get_metadata,
     is_file_url,
     is_path_matched,
@@ -21,6 +24,13 @@ class FileDownloaderMixinConfig(GenericSpiderConfig):
     file_regexp: str = "\\.pdf$"
     output_dir: str = "./"
 
+    @cached_property
+    def file_pattern(self) -> re.Pattern:
+        """
+        Compiled file_regexp.
+        """
+        return re.compile(self.file_regexp)
+
 
 class FileDownloaderMixin:
     """
@@ -31,8 +41,9 @@ class FileDownloaderMixin:
         self,
         res: scrapy.http.Response,
     ):
+        # the hrefs are absolute URLs.
         for href in self.extract_file_download_hrefs(res):
-            if not is_file_url(res.urljoin(href)):
+            if not is_file_url(href):
                 continue
 
             yield scrapy.Request(
@@ -45,16 +56,16 @@ class FileDownloaderMixin:
         self,
         response: scrapy.http.Response,
     ) -> list:
-        xpath_query = "//a[@href]"
-        selectors = response.xpath(xpath_query)
+        # read href from the parsed tree directly. a Selector per <a> tag is
+        # expensive on pages with many links.
         matched_hrefs = []
-        for sel in selectors:
-            href = sel.xpath("@href").get().strip()
+        for a in response.selector.root.iter("a"):
+            href = (a.get("href") or "").strip()
             if not href:
                 continue
 
-            abs_href = response.urljoin(href)
-            if is_path_matched(abs_href, self.args.file_regexp):
+            abs_href = get_absolute_url(response, href)
+            if is_path_matched(abs_href, self.args.file_pattern):
                 matched_hrefs.append(abs_href)
 
         return matched_hrefs
@@ -1,3 +1,4 @@
+from functools import cached_property
 from typing import List, Optional, Protocol
 
 import scrapy
@@ -5,6 +6,15 @@ from lxml import etree
 
 from generic.items import ArticleItem
 from generic.spiders.base import GenericSpiderConfig
+from generic.utils import (
+    XML_PARSER,
+    compile_xpath,
+    count_element_character,
+    get_absolute_url,
+    get_metadata,
+    get_url_without_fragment,
+    xpath_result_to_strings,
+)
 
 
 class ReadMoreCompatible(Protocol):
@@ -29,12 +39,33 @@ class ReadMoreMixinConfig(GenericSpiderConfig):
     source_contains: Optional[str] = None
     source_parent_contains: Optional[str] = None
 
+    @cached_property
+    def read_more_query(self) -> Optional[etree.XPath]:
+        """
+        Compiled read_more_xpath with ``/@href`` appended.
+        """
+        if not self.read_more_xpath:
+            return None
+        return compile_xpath(f"{self.read_more_xpath}/@href")
+
 
 class ReadMoreMixin:
     """
     Provides recursive article parsing capability. See also: ReadMoreSpider.
     """
 
+    # XPath expressions compiled once and shared by all the instances. The
+    # text to search is given as $text when evaluated.
+    _href_by_text_xpath = etree.XPath(
+        "//a[text()=$text]/@href", smart_strings=False
+    )
+    _href_contains_text_xpath = etree.XPath(
+        "//a[contains(., $text)]/@href", smart_strings=False
+    )
+    _href_parent_contains_text_xpath = etree.XPath(
+        "//a[contains(parent::*, $text)]/@href", smart_strings=False
+    )
+
     def parse_summary_page(self, res: scrapy.http.Response):
         """
         Parse the summary article. If "Read more" link is not found, it
@@ -47,66 +78,108 @@ class ReadMoreMixin:
         href = self._find_read_more_link(res)
         if href:
             target_url = res.urljoin(href)
-            self.logger.debug(f"Read more link is found. Parsing {target_url}")
+            self.logger.debug(
+                "Read more link is found. Parsing %s", target_url
+            )
             yield scrapy.Request(target_url, callback=self.parse_article)
         else:
-            self.logger.debug(f"No read more link is found. Parsing {res.url}")
+            self.logger.debug(
+                "No read more link is found. Parsing %s", res.url
+            )
             yield from self.parse_article(res)
 
     def parse_article(
-        self, res: scrapy.http.Response, item: ArticleItem = None
+        self,
+        res: scrapy.http.Response,
+        item: ArticleItem = None,
+        pages: Optional[List[bytes]] = None,
     ):
         """
         Parse an article.
 
+        Args:
+            res: The response of a page of the article.
+            item: The ArticleItem of the first page. None when `res` is the
+                first page.
+            pages: The ``<main>`` elements of the previous pages, except the
+                first one, in UTF-8. They are merged into `item` at the last
+                page, see _merge_article_body().
+
         Yields:
             ArticleItem
         """
 
         if item is None:
-            self.logger.debug(f"Parsing the first page: {res.url}")
+            self.logger.debug("Parsing the first page: %s", res.url)
             item = ArticleItem.from_response(res)
         else:
             self.logger.debug(
-                f"Parsing another page, {res.url}, for {item.url}"
+                "Parsing another page, %s, for %s", res.url, item.url
             )
             try:
-                item = self._merge_article_body(item, res)
-
+                # only the <main> element of the page is needed. it is kept
+                # as bytes, not as a tree, so that requests with it in
+                # cb_kwargs can be serialized, e.g., to JOBDIR.
+                inner_main = ArticleItem._extract_main(res, get_metadata(res))
             except Exception as e:
-                self.logger.error(f"_merge_article_body: {e}")
+                self.logger.error(f"_extract_main: {e}")
                 return
-        self.logger.debug(f"Created ArticleItem for: {item.url}")
+            pages = (pages or []) + [
+                etree.tostring(inner_main, encoding="utf-8")
+            ]
+        self.logger.debug("Created ArticleItem for: %s", item.url)
 
         # we've done with parsing the response. find "Next page" link.
         read_next_href = self._find_next_page_link(res)
         if read_next_href:
-            self.logger.debug(f"Found another page: {read_next_href}")
+            self.logger.debug("Found another page: %s", read_next_href)
             # the response has a link to next page, recursively call this
-            # method with the parsed item.
+            # method with the parsed item and the pages.
             yield scrapy.Request(
                 res.urljoin(read_next_href),
                 self.parse_article,
-                cb_kwargs={"item": item},
+                cb_kwargs={"item": item, "pages": pages},
             )
         else:
-            # We are on the last page. Search for source articles here.
-            self.logger.debug(f"Done with ArticleItem for {item.url}")
+            # We are on the last page. Merge the pages, and search for source
+            # articles here.
+            if pages:
+                try:
+                    item = self._merge_article_body(item, pages)
+                except Exception as e:
+                    self.logger.error(f"_merge_article_body: {e}")
+                    return
+            self.logger.debug("Done with ArticleItem for %s", item.url)
             yield from self._find_and_request_sources(res, item)
 
+    @cached_property
+    def _pending_sources(self) -> dict:
+        """
+        The state of the source requests of parent items, keyed by the URL of
+        the parent item. See _find_and_request_sources().
+
+        The state is kept in the spider, not in the requests, because each
+        request is serialized separately to JOBDIR, and a dict shared by the
+        requests would be copied for each of them.
+        """
+        return {}
+
     def parse_source_only(
         self,
         res: scrapy.http.Response,
-        parent_item: ArticleItem,
-        remaining_urls: list[str],
+        parent_url: str,
+        index: int,
     ):
         """
-        Parse source pages and add the source article to the parent item.
+        Parse a source page and keep the source article for the parent item.
 
         This method handles the extraction of source articles from response
-        objects. It attempts to create an ArticleItem from the response and
-        appends it to the parent item's sources list. If the extraction fails,
-        it logs the error and continues processing the remaining URLs.
+        objects. It attempts to create an ArticleItem from the response, and
+        keeps it as the `index`-th source of the parent item at `parent_url`.
+        If the extraction fails, it logs the error and the source is skipped.
+
+        The sources are requested at once, see _find_and_request_sources().
+        The parent item is yielded by the last one to finish.
 
         Unlike Japanese news outlets, English ones avoid pagination in general
         for better UX. The method assumes that the source page is a
@@ -116,15 +189,60 @@ class ReadMoreMixin:
         # avoid exceptions here to save the parent item even if it fails to
         # scrape the source article. Otherwise, an exception here causes the
         # entire process to fail, resulting data loss of the parent item.
+        source_item = None
         try:
             source_item = ArticleItem.from_response(res)
-            parent_item.sources.append(source_item)
         except Exception as e:
             self.logger.error(
                 f"Failed to scrape a source article at: {res.url} {e}"
             )
 
-        yield from self._request_next_source(parent_item, remaining_urls)
+        yield from self._finish_source(parent_url, index, source_item)
+
+    def _source_failed(self, failure):
+        """
+        The errback of source requests. The parent item is yielded even when
+        a source cannot be downloaded.
+        """
+        request = failure.request
+        self.logger.error(
+            f"Failed to download a source article at: {request.url} "
+            f"{failure.value!r}"
+        )
+        yield from self._finish_source(
+            request.cb_kwargs["parent_url"], request.cb_kwargs["index"], None
+        )
+
+    def _finish_source(
+        self,
+        parent_url: str,
+        index: int,
+        source_item: Optional[ArticleItem],
+    ):
+        """
+        Count a finished source request. When all the source requests have
+        finished, add the sources to the parent item in the order of the
+        links, and yield the parent item.
+        """
+        pending = self._pending_sources.get(parent_url)
+        if pending is None:
+            # e.g., the crawl is resumed from JOBDIR. the state is not
+            # persisted, and the parent item is lost.
+            self.logger.error(f"Unknown parent item of source: {parent_url}")
+            return
+        pending["sources"][index] = source_item
+        # callbacks run in the reactor thread, one at a time. the counter
+        # does not need a lock.
+        pending["count"] -= 1
+        if pending["count"] > 0:
+            return
+        del self._pending_sources[parent_url]
+        parent_item = pending["item"]
+        for source_item in pending["sources"]:
+            if source_item is not None:
+                parent_item.sources.append(source_item)
+        self.logger.debug("Done with sources of %s", parent_url)
+        yield parent_item
 
     def _find_read_more_link(
         self: ReadMoreCompatible,
@@ -144,19 +262,25 @@ class ReadMoreMixin:
 
         Returns:
             str: The href attribute of the found link, or None if no link is found.
+            None without searching when neither option is given.
         """
         if self.args.read_more_xpath:
             self.logger.debug(
-                f"Searching read_more_xpath with: {self.args.read_more_xpath}"
+                "Searching read_more_xpath with: %s", self.args.read_more_xpath
             )
-            return res.xpath(f"{self.args.read_more_xpath}/@href").get()
-        else:
+            hrefs = xpath_result_to_strings(
+                self.args.read_more_query(res.selector.root)
+            )
+            return hrefs[0] if hrefs else None
+        elif self.args.read_more:
             self.logger.debug(
-                f"Searching read_more with: {self.args.read_more}"
+                "Searching read_more with: %s", self.args.read_more
             )
-            return res.xpath(
-                "//a[text()=$text]/@href", text=self.args.read_more
-            ).get()
+            hrefs = self._href_by_text_xpath(
+                res.selector.root, text=self.args.read_more
+            )
+            return hrefs[0] if hrefs else None
+        return None
 
     def _find_next_page_link(
         self,
@@ -175,67 +299,68 @@ class ReadMoreMixin:
 
         Returns:
             str: The href attribute of the found link, or None if no link is
-            found.
+            found. None without searching when neither option is given, i.e.,
+            the articles are single-page.
         """
         if self.args.read_next_contains:
             self.logger.debug(
-                (
-                    "Searching read_next_contains with: ",
-                    f"{self.args.read_next_contains}",
-                )
+                "Searching read_next_contains with: %s",
+                self.args.read_next_contains,
+            )
+            hrefs = self._href_contains_text_xpath(
+                res.selector.root, text=self.args.read_next_contains
             )
-            return res.xpath(
-                "//a[contains(., $text)]/@href",
-                text=self.args.read_next_contains,
-            ).get()
+            return hrefs[0] if hrefs else None
         elif self.args.read_next:
             self.logger.debug(
-                f"Searching read_next with: {self.args.read_next}"
+                "Searching read_next with: %s", self.args.read_next
             )
-            return res.xpath(
-                "//a[text()=$text]/@href", text=self.args.read_next
-            ).get()
+            hrefs = self._href_by_text_xpath(
+                res.selector.root, text=self.args.read_next
+            )
+            return hrefs[0] if hrefs else None
+        return None
 
     def _merge_article_body(
         self,
         base_item: ArticleItem,
-        next_res: scrapy.http.Response,
+        pages: List[bytes],
     ) -> ArticleItem:
         """
-        Merge the content of an article from `next_res` into `base_item`.
+        Merge the content of the other pages of an article into `base_item`.
 
-        This method takes the HTTP response of an article from `next_res` and
-        appends it to the existing content in `base_item`. The method ensures
-        that the resulting XML structure remains valid by properly handling
-        the <main> tags and merging the content without introducing duplicate
+        This method appends the content of `pages` to the existing content
+        in `base_item`, in the order of the pages. The method ensures that
+        the resulting XML structure remains valid by properly handling the
+        <main> tags and merging the content without introducing duplicate
         <main> tags.
 
+        The body is parsed and serialized once for all the pages, instead of
+        once per page.
+
         Args:
             base_item: The base article item to which the
             content will be merged.
-            next_res: The response containing the
-            article content to be merged.
+            pages: The ``<main>`` elements of the other pages in UTF-8.
 
         Returns:
             ArticleItem: The merged article item with the content from
-            `next_res` appended.
+            `pages` appended.
 
         Raises:
             ValueError: If the `base_item.body` does not contain a <main> tag.
             etree.XMLSyntaxError: If there is an error parsing the XML content.
         """
-        # as we are not at the first page, parse the response and
-        # append the parsed content to item. ArticleItem.body has <main>
-        # and we don't want multiple <main> tags in ArticleItem.
+        # ArticleItem.body has <main> and we don't want multiple <main> tags
+        # in ArticleItem.
         #
         # The item we are going to yield has a <main> which has inner
-        # main of the first page + inner main of the next page (the
-        # current response).
-        inner_item = ArticleItem.from_response(next_res)
-
+        # main of the first page + inner main of the other pages.
         try:
-            # find the <main> tag to append inner_item to
-            main = etree.fromstring(base_item.body.encode("utf-8"))
+            # find the <main> tag to append inner_main to
+            main = etree.fromstring(
+                base_item.body.encode("utf-8"), XML_PARSER
+            )
 
             if main is None:
                 # should not happen
@@ -243,29 +368,18 @@ class ReadMoreMixin:
                     f"ArticleItem.body does not have <main>\n{base_item.body}"
                 )
 
-            # extract the content that will be appended to <main> in item.
-            inner_main_xml_strings = (
-                scrapy.Selector(text=inner_item.body)
-                .xpath("//main/node()")
-                .getall()
-            )
-
-            for string in inner_main_xml_strings:
-                # convert string to XML. <root> is required as lxml
-                # complains.
-                xml_fragments = etree.fromstring(f"<root>{string}</root>")
-                # and append them to <main> in the item.
-                for child in xml_fragments:
-                    main.append(child)
-            # replace the body with new XML string.
-            base_item.body = etree.tostring(main, encoding="unicode")
+            for page in pages:
+                # move the children of <main> in the page to <main> in the
+                # item, without serializing the children one by one.
+                main.extend(list(etree.fromstring(page, XML_PARSER)))
         except (ValueError, etree.XMLSyntaxError) as e:
             self.logger.error(
-                f"Failed to parse XML: {next_res.url}\n"
-                f"Inner item:\n{inner_item.body}\n"
+                f"Failed to parse XML of {len(pages)} pages\n"
                 f"Item:\n{base_item.body}\n"
             )
             raise e
+        base_item.body = etree.tostring(main, encoding="unicode")
+        base_item.character_count = count_element_character(main)
         return base_item
 
     def _find_source_links(
@@ -278,57 +392,63 @@ class ReadMoreMixin:
         query = None
         arg = None
         if self.args.source_contains:
-            query = "//a[contains(., $arg)]/@href"
+            query = self._href_contains_text_xpath
             arg = self.args.source_contains
         elif self.args.source_parent_contains:
-            query = "//a[contains(parent::*, $arg)]/@href"
+            query = self._href_parent_contains_text_xpath
             arg = self.args.source_parent_contains
         # no options for sources. yield item and finish.
         if not query:
             return
 
-        self.logger.debug(f"query: {query}\narg: {arg}\n")
-        source_hrefs = res.xpath(query, arg=arg).getall()
-
-        # ensure URLs are absolute.
-        source_urls = [res.urljoin(href) for href in source_hrefs]
-        return list(dict.fromkeys(source_urls))
+        self.logger.debug("query: %s\narg: %s\n", query.path, arg)
+        source_hrefs = query(res.selector.root, text=arg)
+
+        # ensure URLs are absolute, and request a page once even when it is
+        # linked with different fragments. the order of links is kept. the
+        # same href is resolved once.
+        seen_hrefs = set()
+        seen = set()
+        source_urls = []
+        for href in source_hrefs:
+            if href in seen_hrefs:
+                continue
+            seen_hrefs.add(href)
+            url = get_url_without_fragment(get_absolute_url(res, href))
+            if url not in seen:
+                seen.add(url)
+                source_urls.append(url)
+        return source_urls
 
     def _find_and_request_sources(
         self, res: scrapy.http.Response, item: ArticleItem
     ):
         """
-        Find source articles.
+        Find source articles, and request all the sources at once. Scrapy
+        downloads them concurrently, and the item is yielded when all of them
+        have finished.
         """
         unique_urls = self._find_source_links(res)
-        self.logger.debug(f"Found unique_urls: {unique_urls}")
+        self.logger.debug("Found unique_urls: %s", unique_urls)
 
         # no source URLs, yield the item.
         if not unique_urls:
-            self.logger.debug(f"No source URLs found in {res.url}")
-            yield item
-        else:
-            self.logger.debug(f"Source URL(s) found: {unique_urls}")
-            yield from self._request_next_source(item, unique_urls)
-
-    def _request_next_source(
-        self,
-        item: ArticleItem,
-        urls: list[str],
-    ):
-        if not urls:
-            self.logger.debug("_request_next_source: Empty urls.")
+            self.logger.debug("No source URLs found in %s", res.url)
             yield item
             return
 
-        next_url = urls.pop(0)
-        self.logger.debug(f"_request_next_source: next URL: {next_url}")
-        yield scrapy.Request(
-            next_url,
-            callback=self.parse_source_only,
-            cb_kwargs={
-                "parent_item": item,
-                "remaining_urls": urls,
-            },
-            dont_filter=True,
-        )
+        self.logger.debug("Source URL(s) found: %s", unique_urls)
+        # the requests have the key of the state only, see _pending_sources.
+        self._pending_sources[item.url] = {
+            "item": item,
+            "count": len(unique_urls),
+            "sources": [None] * len(unique_urls),
+        }
+        for index, url in enumerate(unique_urls):
+            yield scrapy.Request(
+                url,
+                callback=self.parse_source_only,
+                errback=self._source_failed,
+                cb_kwargs={"parent_url": item.url, "index": index},
+                dont_filter=True,
+            )
@@ -4,22 +4,20 @@
 # See: https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 
 
-# useful for handling different item types with a single interface
-
-
+import asyncio
 import io
+import os
 from pathlib import Path
 
-import pikepdf
-import scrapy
-from itemadapter import ItemAdapter
+from scrapy.crawler import Crawler
 from scrapy.exceptions import DropItem
 
 from generic.items import ArticleItem, FeedItem, FileItem
+from generic.utils import generate_hashed_filename
 
 
 class GenericPipeline:
-    def process_item(self, item, spider):
+    def process_item(self, item):
         return item
 
 
@@ -32,9 +30,7 @@ class DropMissingTextPipeline:
         if not isinstance(item, ArticleItem):
             return item
 
-        adapter = ItemAdapter(item)
-        text = adapter.get("body")
-        if text is None or text == "":
+        if not item.body:
             raise DropItem("Missing text")
         return item
 
@@ -42,31 +38,48 @@ class DropMissingTextPipeline:
 class FeedStoragePipeline:
     """
     Save FeedItem on local disk.
+
+    Files are written in a thread so that the reactor keeps running while
+    the file is written. The pipeline requires the asyncio reactor, the
+    default of scrapy.
     """
 
-    def process_item(self, item, spider):
+    def __init__(self, crawler: Crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler):
+        return cls(crawler)
+
+    @staticmethod
+    def save(file_name: str, content: str) -> Path:
+        """
+        Write `content` to `file_name`, and returns the resolved path.
+        """
+        file_path = Path(file_name).resolve()
+        file_path.write_text(content, encoding="utf-8")
+        return file_path
+
+    async def process_item(self, item):
         if not isinstance(item, FeedItem):
             return item
 
-        adapter = ItemAdapter(item)
-        if isinstance(item, FeedItem):
-            file_name = adapter.get("file_name")
-            content = adapter.get("content")
-            if file_name and content:
-                try:
-                    file_path = Path(file_name).resolve()
-                    file_path.write_text(content, encoding="utf-8")
-                    spider.logger.info(f"Saved: {file_path}")
-                except Exception as e:
-                    raise DropItem(
-                        f"failed to save file at: {file_path}\n{e}\n"
-                    )
-            else:
-                raise DropItem(
-                    "file_name and content must be present:\n"
-                    f"file_name: {file_name}\n"
-                    f"content: {content}\n"
+        file_name = item.file_name
+        content = item.content
+        if file_name and content:
+            try:
+                file_path = await asyncio.to_thread(
+                    self.save, file_name, content
                 )
+                self.crawler.spider.logger.info(f"Saved: {file_path}")
+            except Exception as e:
+                raise DropItem(f"failed to save file at: {file_name}\n{e}\n")
+        else:
+            raise DropItem(
+                "file_name and content must be present:\n"
+                f"file_name: {file_name}\n"
+                f"content: {content}\n"
+            )
         return item
 
 
@@ -85,74 +98,86 @@ class FileItemPipeline:
       FileItem.
     """
 
-    def process_item(self, item: FileItem, spider: scrapy.Spider) -> FileItem:
+    def __init__(self, crawler: Crawler):
+        self.crawler = crawler
+        # lower-cased file extensions to methods that process the FileItem.
+        self.processors = {
+            ".pdf": self.process_pdf_item,
+        }
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler):
+        return cls(crawler)
+
+    async def process_item(self, item: FileItem) -> FileItem:
         """
         Process FileItem.
 
         1. Call a specific method to process the FileItem.
         2. Generate a unique, hashed file name
-        3. Create a new FileItem with the generated file name.
+        3. Replace the file name of the FileItem with the generated file name.
+
+        The FileItem is modified in place. content is not copied.
+
+        The specific method runs in a thread, as processing a file, e.g., a
+        PDF with pikepdf, is slow and does not need the reactor. Other items
+        are processed, and downloaded, in the meantime.
         """
         if not isinstance(item, FileItem):
             return item
 
-        import os
-
-        from generic.utils import generate_hashed_filename
-
-        adapter = ItemAdapter(item)
-        filename = adapter.get("filename")
+        filename = item.get("filename")
         if not filename:
             raise DropItem("Failed to process FileItem: missing filename")
 
-        _, ext = os.path.splitext(adapter.get("filename", "").lower())
+        _, ext = os.path.splitext(filename.lower())
         if ext == "":
-            raise DropItem(
-                "filename does not have an extention: ",
-                f"{adapter.get('filename')}",
-            )
+            raise DropItem(f"filename does not have an extention: {filename}")
 
+        logger = self.crawler.spider.logger
         try:
-            match ext:
-                case ".pdf":
-                    spider.logger.debug(f"Processing PDF file: {filename}")
-                    new_item = self.process_pdf_item(item, spider).deepcopy()
-                case _:
-                    spider.logger.debug(
-                        f"No additional processing required: {filename}"
-                    )
-                    new_item = item.deepcopy()
+            processor = self.processors.get(ext)
+            if processor:
+                logger.debug(f"Processing {ext} file: {filename}")
+                item = await asyncio.to_thread(processor, item)
+            else:
+                logger.debug(
+                    f"No additional processing required: {filename}"
+                )
         except Exception as e:
             raise DropItem(f"Failed to process FileItem: {e}")
 
         try:
-            new_item["filename"] = generate_hashed_filename(
-                new_item.get("url")
-            )
+            item["filename"] = generate_hashed_filename(item.get("url"))
         except Exception as e:
             raise DropItem(f"generate_hashed_filename: {e}")
-        return new_item
+        return item
 
-    def process_pdf_item(
-        self,
-        item: FileItem,
-        spider: scrapy.Spider,
-    ) -> FileItem:
+    def process_pdf_item(self, item: FileItem) -> FileItem:
         """
         Process PDF FileItem.
 
         1. Adding metadata to the PDF
         """
+        # pikepdf, and qpdf, are loaded when a PDF is processed, not by every
+        # spider that loads the pipelines.
+        import pikepdf
 
-        adapter = ItemAdapter(item)
+        output_stream = io.BytesIO()
         try:
-            with pikepdf.open(io.BytesIO(adapter.get("content"))) as pdf:
-                pdf.docinfo["/FileURL"] = adapter.get("url") or ""
+            # the metadata is in the document information dictionary and XMP.
+            # pushing inherited attributes down to every page is not needed
+            # for that, and it adds an object to each page of the output.
+            with pikepdf.open(
+                io.BytesIO(item.get("content")),
+                inherit_page_attributes=False,
+            ) as pdf:
+                pdf.docinfo["/FileURL"] = item.get("url") or ""
                 pdf.docinfo["/OriginalFilename"] = (
-                    adapter.get("filename") or ""
+                    item.get("filename") or ""
                 )
 
-                meta = adapter.get("metadata")
+                meta = item.get("metadata")
                 if meta:
                     pdf.docinfo["/SourceURL"] = meta.get("url") or ""
                     pdf.docinfo["/SourceSiteName"] = (
@@ -165,8 +190,8 @@ class FileItemPipeline:
                     pdf.docinfo["/SourceAuthor"] = meta.get("author") or ""
 
                 with pdf.open_metadata() as xmp:
-                    xmp["FileURL"] = (adapter.get("url")) or ""
-                    xmp["OriginalFilename"] = adapter.get("filename") or ""
+                    xmp["FileURL"] = (item.get("url")) or ""
+                    xmp["OriginalFilename"] = item.get("filename") or ""
 
                     if meta:
                         xmp["SourceURL"] = meta.get("url") or ""
@@ -176,13 +201,17 @@ class FileItemPipeline:
                         )
                         xmp["SourceTitle"] = meta.get("title") or ""
                         xmp["SourceAuthor"] = meta.get("author") or ""
-                output_stream = io.BytesIO()
                 pdf.save(output_stream)
-                adapter["content"] = output_stream.getvalue()
         except Exception as e:
-            spider.logger.error(f"Failed to process PDF: {e}", exc_info=True)
+            self.crawler.spider.logger.error(
+                f"Failed to process PDF: {e}", exc_info=True
+            )
             raise DropItem(f"Failed to process PDF: {e}")
 
+        # the input is released when the PDF is closed. getvalue() of a
+        # BytesIO that is not written anymore returns its buffer without a
+        # copy.
+        item["content"] = output_stream.getvalue()
         return item
 
 
@@ -190,25 +219,60 @@ class FileItemStoragePipeline:
     """
     Save FileItem on local disk. This pipeline should be at the end of
     ITEM_PIPELINES.
+
+    Files are written in a thread so that the reactor keeps running while
+    the file is written.
     """
 
-    def process_item(self, item, spider):
+    DONTNEED_MIN_SIZE = 1024 * 1024
+    """
+    Files of this size in bytes or larger are dropped from the page cache
+    after they are written, where the platform supports it. Downloaded files
+    are written once and not read by the crawler again.
+    """
+
+    def __init__(self, crawler: Crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler: Crawler):
+        return cls(crawler)
+
+    @classmethod
+    def write_file(cls, file_path: Path, content: bytes):
+        """
+        Write `content` to `file_path` with a single file descriptor, without
+        copying `content`.
+        """
+        fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            view = memoryview(content)
+            while view:
+                view = view[os.write(fd, view) :]
+            if len(content) >= cls.DONTNEED_MIN_SIZE and hasattr(
+                os, "posix_fadvise"
+            ):
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+    async def process_item(self, item):
         if not isinstance(item, FileItem):
             return item
 
-        adapter = ItemAdapter(item)
-
-        if not adapter.get("content"):
+        if not item.get("content"):
             raise DropItem("Missing item.content")
 
-        if adapter.get("filename") and adapter.get("output_dir"):
+        if item.get("filename") and item.get("output_dir"):
             try:
-                filename = adapter.get("filename")
-                output_dir = adapter.get("output_dir")
+                filename = item.get("filename")
+                output_dir = item.get("output_dir")
 
                 file_path = (Path(output_dir) / filename).resolve()
-                file_path.write_bytes(adapter.get("content"))
-                spider.logger.info(f"Saved: {file_path}")
+                await asyncio.to_thread(
+                    self.write_file, file_path, item.get("content")
+                )
+                self.crawler.spider.logger.info(f"Saved: {file_path}")
             except Exception as e:
                 raise DropItem(
                     f"failed to save file:\n"
@@ -219,6 +283,7 @@ class FileItemStoragePipeline:
         else:
             raise DropItem(
                 f"Missing filename or output_dir\n"
-                f"filename: {adapter.get('filename')}\n"
-                f"output_dir: {adapter.get('output_dir')}\n"
+                f"filename: {item.get('filename')}\n"
+                f"output_dir: {item.get('output_dir')}\n"
             )
+        return item
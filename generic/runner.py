@@ -5,7 +5,7 @@ from scrapy.spiderloader import SpiderLoader
 from scrapy.utils.project import get_project_settings
 
 
-@dataclass
+@dataclass(slots=True)
 class SpiderRunnerConfig:
     spider: str
     """
@@ -52,9 +52,11 @@ DOWNLOADER_MIDDLEWARES = {
     "scrapy_impersonate.RandomBrowserMiddleware": 1000,
 }
 
+# PersistentImpersonateDownloadHandler reuses connections to hosts, see
+# generic.download_handlers.
 DOWNLOAD_HANDLERS = {
-    "http": "scrapy_impersonate.ImpersonateDownloadHandler",
-    "https": "scrapy_impersonate.ImpersonateDownloadHandler",
+    "http": "generic.download_handlers.PersistentImpersonateDownloadHandler",
+    "https": "generic.download_handlers.PersistentImpersonateDownloadHandler",
 }
 
 # Enable or disable extensions
@@ -95,5 +97,10 @@ ITEM_PIPELINES = {
 # HTTPCACHE_IGNORE_HTTP_CODES = []
 # HTTPCACHE_STORAGE = "scrapy.extensions.httpcache.FilesystemCacheStorage"
 
+# Extract articles in a process pool. See generic.mixins.extract_pool.
+EXTRACT_IN_POOL = False
+# The number of workers in the pool. 0 means the number of CPUs.
+EXTRACT_POOL_WORKERS = 0
+
 # Set settings whose default value is deprecated to a future-proof value
 FEED_EXPORT_ENCODING = "utf-8"
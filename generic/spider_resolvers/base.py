@@ -1,9 +1,11 @@
 import re
 from dataclasses import dataclass, field
-from typing import List
+from typing import List, Optional
 
+from generic.utils import compile_router
 
-@dataclass
+
+@dataclass(slots=True)
 class SpiderResolverRoute:
     patterns: List[str]
     """
@@ -22,27 +24,62 @@ class SpiderResolverRoute:
     Arguments to pass spiders. Normally, a "key=value" pair.
     """
 
+    compiled: List[re.Pattern] = field(init=False, repr=False, compare=False)
+    """
+    Compiled `patterns`, in the same order. Set in __post_init__.
+    """
+
+    def __post_init__(self):
+        self.compiled = [re.compile(p) for p in self.patterns]
+
 
-@dataclass
+@dataclass(slots=True)
 class SpiderResolverConfig:
     routes: List[SpiderResolverRoute]
 
 
+ROUTE_GROUP_PREFIX = "route_"
+
+
 class SpiderResolver:
     def __init__(self, config: SpiderResolverConfig):
         """
         The constructor.
         """
         self.config = config
+        self.router = self.compile_router(config.routes)
+
+    @staticmethod
+    def compile_router(
+        routes: List[SpiderResolverRoute],
+    ) -> Optional[re.Pattern]:
+        """
+        Combine the patterns of all the routes into a single pattern so that
+        a URL is resolved with one match. See compile_router() in
+        generic.utils.
+
+        Returns None when the patterns cannot be combined. resolve() searches
+        the routes one by one then.
+        """
+        return compile_router(
+            [route.patterns for route in routes], ROUTE_GROUP_PREFIX
+        )
 
     def resolve(self, url: str) -> tuple[str, List[str]]:
         """
         Resolve the spider to use.
         """
+        if self.router is not None:
+            m = self.router.match(url)
+            if m:
+                i = int(m.lastgroup.removeprefix(ROUTE_GROUP_PREFIX))
+                route = self.config.routes[i]
+                return route.spider_name, route.args
+            raise SpiderResolverNoRouteError(url, self.config.routes)
 
         for route in self.config.routes:
-            for pattern in route.patterns:
-                if re.search(pattern, url):
+            for pattern in route.compiled:
+                if pattern.search(url):
                     return route.spider_name, route.args
         raise SpiderResolverNoRouteError(url, self.config.routes)
 
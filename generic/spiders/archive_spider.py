@@ -1,10 +1,13 @@
+from functools import cached_property
 from typing import Optional, Type
 
 import scrapy
+from lxml import etree
 
 from generic.mixins.read_more import ReadMoreMixin
 from generic.spiders.base import GenericSpider
 from generic.spiders.read_more import ReadMoreSpiderConfig
+from generic.utils import compile_xpath, xpath_result_to_strings
 
 
 class ArchiveSpiderConfig(ReadMoreSpiderConfig):
@@ -24,7 +27,24 @@ class ArchiveSpiderConfig(ReadMoreSpiderConfig):
     """
     XPath expression to extract a next archive link from the archive page.
     """
-    pass
+
+    @cached_property
+    def archive_article_query(self) -> Optional[etree.XPath]:
+        """
+        Compiled archive_article_xpath.
+        """
+        if not self.archive_article_xpath:
+            return None
+        return compile_xpath(self.archive_article_xpath)
+
+    @cached_property
+    def archive_next_query(self) -> Optional[etree.XPath]:
+        """
+        Compiled archive_next_xpath.
+        """
+        if not self.archive_next_xpath:
+            return None
+        return compile_xpath(self.archive_next_xpath)
 
 
 class ArchiveSpider(
@@ -86,24 +106,33 @@ class ArchiveSpider(
                 Requests for individual articles and the next archive page.
         """
         self.logger.debug(
-            "Looking for a tag with archive_article_xpath"
-            f"archive_article_xpath:\n{self.args.archive_article_xpath}"
+            "Looking for a tag with archive_article_xpath:\n%s",
+            self.args.archive_article_xpath,
+        )
+        query = self.args.archive_article_query
+        article_hrefs = (
+            xpath_result_to_strings(query(response.selector.root))
+            if query
+            else []
         )
-        article_hrefs = response.xpath(
-            self.args.archive_article_xpath
-        ).getall()
 
         for article_href in article_hrefs:
-            self.logger.debug(f"Found href: {article_href}")
+            self.logger.debug("Found href: %s", article_href)
             yield response.follow(article_href, callback=self.parse_article)
 
         self.logger.debug(
-            "Looking for a tag with archive_next_xpath"
-            f"archive_article_xpath:\n{self.args.archive_next_xpath}"
+            "Looking for a tag with archive_next_xpath:\n%s",
+            self.args.archive_next_xpath,
+        )
+        query = self.args.archive_next_query
+        next_hrefs = (
+            xpath_result_to_strings(query(response.selector.root))
+            if query
+            else []
         )
-        archive_next_href = response.xpath(self.args.archive_next_xpath).get()
+        archive_next_href = next_hrefs[0] if next_hrefs else None
         if archive_next_href:
-            self.logger.debug(f"Found href: {archive_next_href}")
+            self.logger.debug("Found href: %s", archive_next_href)
             yield response.follow(
                 archive_next_href, callback=self.parse_archive_index
             )
@@ -71,11 +71,11 @@ class GenericSpider(Args[T], scrapy.Spider, Generic[T]):
             else self.args.urls
         )
 
-        # allowed_domains does not support IDN. fix it up.
-        domains = []
-        for url in urls:
-            domains.append(urlparse(idn2ascii(url)).netloc)
-        unique_domains = list(set(domains))
+        # allowed_domains does not support IDN. fix it up. the order of URLs
+        # is kept so that allowed_domains is the same for every run.
+        unique_domains = list(
+            dict.fromkeys(urlparse(idn2ascii(url)).netloc for url in urls)
+        )
 
         # Instead of self.allowed_domains.extend(), we assign a new list to
         # self.allowed_domains. This ensures that we are creating an instance
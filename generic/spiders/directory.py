@@ -6,11 +6,14 @@ import scrapy
 from scrapy.linkextractors import LinkExtractor
 from scrapy.spiders import Rule
 
-from generic.items import ArticleItem
+from generic.mixins.extract_pool import ExtractPoolMixin
 from generic.utils import idn2ascii
 
+_DENY_RE = re.compile(r"\.(?:pdf|docx)(?:[?#]|$)", re.IGNORECASE)
+""" Links to files that the spider does not parse. """
 
-class DirectorySpider(scrapy.spiders.CrawlSpider):
+
+class DirectorySpider(ExtractPoolMixin, scrapy.spiders.CrawlSpider):
     """
     A spider that crawls pages under a directory. The directory is the base
     directory of the last component of the given URL.
@@ -42,8 +45,38 @@ class DirectorySpider(scrapy.spiders.CrawlSpider):
         "HTTPCACHE_DIR": "httpcache",
     }
 
-    def parse_body(self, response):
-        yield ArticleItem.from_response(response)
+    _rule_cache: dict[tuple[str, str], tuple[Rule, ...]] = {}
+    """
+    Rules by (netloc, path), shared by the instances. CrawlSpider copies the
+    rules before binding them to an instance.
+    """
+
+    @staticmethod
+    def build_rules(netloc: str, path: str) -> tuple[Rule, ...]:
+        """
+        Returns rules that crawl pages under `path` of `netloc`.
+        """
+        # links are absolute URLs. a prefix test is enough to find links
+        # under the directory.
+        prefixes = (f"http://{netloc}{path}", f"https://{netloc}{path}")
+
+        def in_directory(links):
+            return [link for link in links if link.url.startswith(prefixes)]
+
+        return (
+            Rule(
+                LinkExtractor(deny=_DENY_RE),
+                callback="parse_body",
+                follow=True,
+                process_links=in_directory,
+            ),
+            Rule(
+                LinkExtractor(deny=(r".*")),
+            ),
+        )
+
+    async def parse_body(self, response):
+        yield await self.article_item_from_response(response)
 
     def __init__(self, url=None, *args, **kwargs):
         self.start_urls = [idn2ascii(url)]
@@ -61,16 +94,9 @@ class DirectorySpider(scrapy.spiders.CrawlSpider):
         if not path.endswith("/"):
             path += "/"
 
-        regex = rf"^https?://{re.escape(parsed.netloc)}{re.escape(path)}.*"
-        self.rules = (
-            Rule(
-                LinkExtractor(allow=[regex], deny=(r"\.(pdf|docx)")),
-                callback="parse_body",
-                follow=True,
-            ),
-            Rule(
-                LinkExtractor(deny=(r".*")),
-            ),
-        )
+        key = (parsed.netloc, path)
+        if key not in self._rule_cache:
+            self._rule_cache[key] = self.build_rules(*key)
+        self.rules = self._rule_cache[key]
+        # CrawlSpider.__init__() compiles the rules.
         super(DirectorySpider, self).__init__(*args, **kwargs)
-        self._compile_rules()
@@ -1,18 +1,30 @@
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Type
+from typing import Iterable, NamedTuple, Type
 
 import scrapy
 import yaml
 from feedgen.feed import FeedGenerator
+from lxml import etree
 from pydantic import BaseModel
 
 from generic.items import FeedItem
 from generic.spiders.base import GenericSpider, GenericSpiderConfig
+from generic.utils import compile_xpath, xpath_result_to_strings
 
+try:
+    # the loader of libyaml, when PyYAML is built with it.
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
-class FeedEntry(BaseModel):
+
+class FeedEntry(NamedTuple):
     """
     A class for internal use.
+
+    A light-weight tuple, not a model, as an entry is created for every link
+    in the page, and the values are not validated.
     """
     id: str
     title: str
@@ -74,12 +86,31 @@ class FeedConfig(BaseModel):
 
     xpath_title: str
     """
-    The path to the feed title.
+    The path to the feed title, i.e., the text of the link.
     """
     feed_type: str = "atom"
     """
     Type of the feed. Either ``atom`` or ``rss``.
     """
+    pretty: bool = False
+    """
+    Whether to indent the generated feed. Feed readers do not need the
+    indentation, and the feed is smaller without it.
+    """
+
+    @cached_property
+    def href_query(self) -> etree.XPath:
+        """
+        Compiled xpath_href.
+        """
+        return compile_xpath(self.xpath_href)
+
+    @cached_property
+    def title_query(self) -> etree.XPath:
+        """
+        Compiled xpath_title.
+        """
+        return compile_xpath(self.xpath_title)
 
 
 class FeedSpiderConfig(GenericSpiderConfig):
@@ -100,6 +131,21 @@ class FeedSpiderConfig(GenericSpiderConfig):
     """
 
 
+@lru_cache(maxsize=8)
+def _load_config_cached(path_str: str, mtime: float) -> FeedSpiderConfig:
+    """
+    Load and validate the configuration file at `path_str`. The result is
+    cached by the path and the modification time, so that spiders created in
+    the same process read the file once until it is modified.
+    """
+    path = Path(path_str)
+    content = path.read_text(encoding="utf-8")
+    raw_data = yaml.load(content, Loader=SafeLoader)
+    return FeedSpiderConfig(
+        urls=[], feed_config=raw_data.get("feed_config", {}), config=path
+    )
+
+
 class FeedSpider(GenericSpider[FeedSpiderConfig]):
     """
     A spider that generates Atom/RSS feeds. The spider crawls URLs in a
@@ -142,11 +188,7 @@ class FeedSpider(GenericSpider[FeedSpiderConfig]):
         self.args = config_obj
 
     def _load_config(self, path: Path):
-        content = path.read_text(encoding="utf-8")
-        raw_data = yaml.safe_load(content)
-        return FeedSpiderConfig(
-            urls=[], feed_config=raw_data.get("feed_config", {}), config=path
-        )
+        return _load_config_cached(str(path), path.stat().st_mtime)
 
     def start_requests(self):
         for url, cfg in self.args.feed_config.items():
@@ -159,21 +201,19 @@ class FeedSpider(GenericSpider[FeedSpiderConfig]):
         url = response.url
         lang = response.xpath("/html/@lang").get() or "en"
         config = self.args.feed_config[url]
-        xpath_title = config.xpath_title
-        xpath_href = config.xpath_href
         page_title = (
             response.xpath("//title/text()").get() or f"Feed for {url}"
         )
 
-        titles = response.xpath(xpath_title).getall()
-        hrefs = response.xpath(xpath_href).getall()
+        # the queries are compiled once per feed, and evaluated on the parsed
+        # tree of the response.
+        root = response.selector.root
+        titles = xpath_result_to_strings(config.title_query(root))
+        hrefs = xpath_result_to_strings(config.href_query(root))
 
-        feed_entries = []
-        for title, href in zip(titles, hrefs):
-            abs_url = response.urljoin(href)
-            feed_entries.append(
-                FeedEntry(id=abs_url, title=title.strip(), link=abs_url)
-            )
+        # the entries are generated while the feed is built, without a list
+        # of them.
+        feed_entries = self._feed_entries(response, titles, hrefs)
         feed_meta = Feed(
             id=url, type=config.feed_type, lang=lang, title=page_title
         )
@@ -182,14 +222,26 @@ class FeedSpider(GenericSpider[FeedSpiderConfig]):
             feed=feed_meta,
             feed_entries=feed_entries,
             file_name=config.file_name,
+            pretty=config.pretty,
         )
 
+    @staticmethod
+    def _feed_entries(
+        response: scrapy.http.Response,
+        titles: Iterable[str],
+        hrefs: Iterable[str],
+    ) -> Iterable[FeedEntry]:
+        for title, href in zip(titles, hrefs):
+            url = response.urljoin(href)
+            yield FeedEntry(id=url, title=title.strip(), link=url)
+
     def _generate_feed(
         self,
         url: str,
         feed: Feed,
-        feed_entries: list[FeedEntry],
+        feed_entries: Iterable[FeedEntry],
         file_name: str,
+        pretty: bool = False,
     ) -> FeedItem:
         fg = FeedGenerator()
         fg.id(feed.id)
@@ -206,9 +258,9 @@ class FeedSpider(GenericSpider[FeedSpiderConfig]):
         generated_feed = None
         match feed.type:
             case "atom":
-                generated_feed = fg.atom_str(pretty=True)
+                generated_feed = fg.atom_str(pretty=pretty)
             case "rss":
-                generated_feed = fg.rss_str(pretty=True)
+                generated_feed = fg.rss_str(pretty=pretty)
             case _:
                 raise ValueError
 
@@ -1,3 +1,5 @@
+import re
+from functools import cached_property
 from typing import Type
 
 import scrapy
@@ -7,7 +9,7 @@ from generic.mixins.file_downloader import (
     FileDownloaderMixinConfig,
 )
 from generic.spiders.base import GenericSpider
-from generic.utils import is_file_url, is_path_matched
+from generic.utils import get_absolute_url, is_file_url, is_path_matched
 
 
 class FileDownloadSpiderConfig(FileDownloaderMixinConfig):
@@ -16,6 +18,13 @@ class FileDownloadSpiderConfig(FileDownloaderMixinConfig):
     A regular expression for URL path part that the spider should crawls.
     """
 
+    @cached_property
+    def path_pattern(self) -> re.Pattern:
+        """
+        Compiled path_regexp.
+        """
+        return re.compile(self.path_regexp)
+
 
 class FileDownloadSpider(
     GenericSpider[FileDownloadSpiderConfig], FileDownloaderMixin
@@ -60,12 +69,12 @@ class FileDownloadSpider(
             if not href:
                 continue
 
-            abs_href = res.urljoin(href)
+            abs_href = get_absolute_url(res, href)
             # ignore links to files.
             if is_file_url(abs_href):
                 continue
 
             # crawl the found links that match path_regexp by recursively
             # calling the method.
-            if is_path_matched(abs_href, self.args.path_regexp):
+            if is_path_matched(abs_href, self.args.path_pattern):
                 yield res.follow(href, callback=self.parse_page)
@@ -3,11 +3,11 @@ from urllib.parse import urljoin, urlparse
 from scrapy.http import Response
 from scrapy.spiders import SitemapSpider
 
-from generic.items import ArticleItem
+from generic.mixins.extract_pool import ExtractPoolMixin
 from generic.utils import idn2ascii
 
 
-class WordPressSpider(SitemapSpider):
+class WordPressSpider(ExtractPoolMixin, SitemapSpider):
     """
     A spider that scrapes all the articles with sitemap.xml.
     """
@@ -28,9 +28,5 @@ class WordPressSpider(SitemapSpider):
         self.logger.debug(f"sitemap_urls: {self.sitemap_urls}")
         self.logger.debug(f"allowed_domains: {self.allowed_domains}")
 
-    def sitemap_filter(self, entries):
-        for entry in entries:
-            yield entry
-
-    def parse(self, response: Response) -> ArticleItem:
-        return ArticleItem.from_response(response)
+    async def parse(self, response: Response):
+        yield await self.article_item_from_response(response)
@@ -1,7 +1,98 @@
+import json
+import os
+import re
+from datetime import datetime
+from functools import lru_cache
+from hashlib import shake_128
+from urllib.parse import unquote, urldefrag, urlparse, urlunparse
+from weakref import WeakKeyDictionary
+
 import extruct
 from dateutil import parser
+from lxml import etree
+from pathvalidate import FileNameSanitizer
+from scrapy import Selector
 from scrapy.http import Response
 
+FILE_URL_PATTERN = re.compile(r"(?:/|\.html?|\.php|\.aspx?|/[^./]+)$")
+"""
+The default pattern of is_file_url(). A path that matches the pattern is a
+page, not a file.
+"""
+
+XML_PARSER = etree.XMLParser(collect_ids=False, huge_tree=True)
+"""
+The parser of the XML generated by trafilatura, and of ArticleItem.body.
+
+The XML is generated, not downloaded, and can be big, so the limits of
+libxml2 for untrusted input are lifted with huge_tree. IDs are not
+indexed, as nothing looks up elements by ID.
+"""
+
+XPATH_NAMESPACES = {
+    "re": "http://exslt.org/regular-expressions",
+    "set": "http://exslt.org/sets",
+}
+"""
+The namespaces of the EXSLT extensions that parsel, and Response.xpath(),
+provide by default, e.g., ``re:test()``.
+"""
+
+_STRING_XPATH = etree.XPath("string()", smart_strings=False)
+_META_PROPERTY_XPATH = etree.XPath(
+    "//meta[@property=$name]/@content", smart_strings=False
+)
+_HEAD_TITLE_XPATH = etree.XPath(
+    "/html/head/title/text()", smart_strings=False
+)
+_TITLE_XPATH = etree.XPath("//title/text()", smart_strings=False)
+_LANG_XPATH = etree.XPath("/html/@lang", smart_strings=False)
+
+_metadata_cache: WeakKeyDictionary = WeakKeyDictionary()
+"""
+Metadata of responses, see get_metadata(). An entry is removed when the
+response is garbage-collected.
+"""
+
+
+@lru_cache(maxsize=128)
+def compile_xpath(path: str) -> etree.XPath:
+    """
+    Returns the compiled XPath expression of `path`, without smart strings.
+
+    Compiled expressions are cached by `path`, and shared by all the spiders
+    in the process, e.g., many spiders with the same user-provided XPath.
+
+    The EXSLT extensions in XPATH_NAMESPACES are available, as in
+    Response.xpath().
+    """
+    return etree.XPath(
+        path, namespaces=XPATH_NAMESPACES, smart_strings=False
+    )
+
+
+def xpath_result_to_strings(result) -> list[str]:
+    """
+    Returns the result of a compiled XPath expression as a list of strings,
+    like SelectorList.getall() of parsel.
+
+    An expression may return a scalar, e.g., ``string(//a/@href)``, instead
+    of a list. A scalar is a list of one string. Elements are serialized as
+    HTML, and booleans are "1" or "0".
+    """
+    if not isinstance(result, list):
+        result = [result]
+    strings = []
+    for value in result:
+        if isinstance(value, etree._Element):
+            value = etree.tostring(
+                value, method="html", encoding="unicode", with_tail=False
+            )
+        elif isinstance(value, bool):
+            value = "1" if value else "0"
+        strings.append(str(value))
+    return strings
+
 
 def get_meta_property(response: Response, name: str) -> str:
     """
@@ -11,8 +102,41 @@ def get_meta_property(response: Response, name: str) -> str:
         - response The response object.
         - name Name of the property.
     """
-    path = f"//meta[@property='{name}']/@content"
-    return response.xpath(path).get()
+    contents = _META_PROPERTY_XPATH(response.selector.root, name=name)
+    return contents[0] if contents else None
+
+
+def get_meta_contents(res: Response) -> dict:
+    """
+    Collects the content of all ``<meta>`` tags in a single pass.
+
+    Returns a dict keyed by ``("property", value)`` or ``("name", value)``.
+    When multiple tags have the same key, the first one wins.
+
+    Args:
+        - res The response object.
+    """
+    metas = {}
+    for meta in res.selector.root.iter("meta"):
+        content = meta.get("content")
+        if content is None:
+            continue
+        for attr in ("property", "name"):
+            value = meta.get(attr)
+            if value is not None:
+                metas.setdefault((attr, value), content)
+    return metas
+
+
+def _get_lang(root: etree._Element) -> str | None:
+    """
+    Returns the two-letter language code of the document, e.g., "ja" for
+    <html lang="ja-JP">, or None when the document has no lang.
+    """
+    langs = _LANG_XPATH(root)
+    if not langs:
+        return None
+    return langs[0].split("-")[0] or None
 
 
 def extract_article(res: Response) -> dict:
@@ -26,51 +150,89 @@ def extract_article(res: Response) -> dict:
         - res The response object
 
     """
-    import json
-
+    # trafilatura is loaded by the callers of the function only, like
+    # ArticleItem does. the other imports are at the module level.
     from trafilatura import extract
 
-    metadata = get_metadata(res)
+    # only the language is needed here. it is read from the tree, instead of
+    # building the whole metadata with get_metadata().
+    root = res.selector.root
     return json.loads(
         extract(
-            res.text,
+            root,
             url=res.url,
             with_metadata=True,
-            target_language=metadata["lang"],
+            target_language=_get_lang(root),
             output_format="json",
         )
     )
 
 
+@lru_cache(maxsize=1024)
 def idn2ascii(url_str: str) -> str:
     """
-    Returns ascii URL from a URL containing IDN.
+    Returns ascii URL from a URL containing IDN. The results are cached, as
+    the same URLs are converted by every spider created with them.
     """
-    from urllib.parse import urlparse, urlunparse
-
     parsed = urlparse(url_str.strip())
     puny_host = parsed.netloc.encode("idna").decode("ascii")
     new_parsed = parsed._replace(netloc=puny_host)
     return urlunparse(new_parsed)
 
 
+def get_absolute_url(res: Response, href: str) -> str:
+    """
+    Returns `href` as an absolute URL, relative to `res`. An absolute HTTP(S)
+    URL is returned as is, without parsing it with Response.urljoin().
+    """
+    if href.startswith(("http://", "https://")):
+        return href
+    return res.urljoin(href)
+
+
+def get_url_without_fragment(url_str: str) -> str:
+    """
+    Returns the URL without the fragment, e.g., `#section`.
+    """
+    return urldefrag(url_str).url
+
+
 def get_uniform_metadata(
-    html: str,
+    html: str | bytes | etree._Element,
     base_url: str,
+    encoding: str = "UTF-8",
 ):
+    """
+    Returns JSON-LD and OpenGraph metadata in `html`.
+
+    `html` is either a document, or a parsed tree. `encoding` is used for a
+    document only.
+    """
     syntaxes = ["json-ld", "opengraph"]
 
     return extruct.extract(
         html,
         base_url=base_url,
+        encoding=encoding,
         syntaxes=syntaxes,
         uniform=True,
     )
 
 
 def str_to_isoformat(string: str):
-    if str is None:
+    """
+    Returns a date string in ISO 8601 format, or None when the string cannot
+    be parsed.
+
+    Most pages have dates in ISO 8601 format already. They are parsed with
+    datetime.fromisoformat(), and other formats with dateutil.
+    """
+    if string is None:
         return None
+    try:
+        return datetime.fromisoformat(string).isoformat()
+    except (ValueError, TypeError):
+        pass
     try:
         dt = parser.parse(string)
         return dt.isoformat()
@@ -82,11 +244,28 @@ def get_metadata(res: Response) -> dict:
     """
     Generate metadata from Response.
 
+    The metadata is cached for the response, so that a response is parsed
+    once even when the metadata is asked multiple times, e.g., by every file
+    downloaded from the same page. The caller may modify the returned dict.
+
     Returns: dict
     """
-    author = res.xpath("//meta[@name='author']/@content").get()
+    metadata = _metadata_cache.get(res)
+    if metadata is None:
+        metadata = _get_metadata(res)
+        _metadata_cache[res] = metadata
+    return dict(metadata)
+
+
+def _get_metadata(res: Response) -> dict:
+    metas = get_meta_contents(res)
+    author = metas.get(("name", "author"))
 
-    data = get_uniform_metadata(res.text, res.url)
+    # the tree parsed by the selector is passed so that extruct does not
+    # parse the page again. the whole tree is searched because JSON-LD is
+    # often in <body>.
+    root = res.selector.root
+    data = get_uniform_metadata(root, res.url)
 
     og_list = data.get("opengraph", [])
     og = og_list[0] if og_list else {}
@@ -100,20 +279,23 @@ def get_metadata(res: Response) -> dict:
         else ld_raw
     )
 
+    def first(values):
+        return values[0] if values else None
+
     def dig(d, *keys):
         for k in keys:
             d = d.get(k) if isinstance(d, dict) else None
         return d
 
-    def locale_to_lang(locale) -> str:
+    def ld_author_name(ld) -> str:
         """
-        Convert locale string to two-letter language code, e.g., from "ja-JP"
-        to "ja".
+        Returns the name of the author in JSON-LD. When the author is a list,
+        the first author is used.
         """
-        if locale is None:
-            return None
-
-        return locale.split("-")[0]
+        author = ld.get("author")
+        if isinstance(author, list) and author:
+            author = author[0]
+        return author.get("name") if isinstance(author, dict) else None
 
     return {
         "url": (
@@ -125,16 +307,20 @@ def get_metadata(res: Response) -> dict:
         "title": (
             og.get("og:title")
             or ld.get("headline")
-            or res.xpath("//title/text()").get()
+            # the rooted query does not walk <body>. the title is not in
+            # <head> when the parser has closed <head> early, e.g., after a
+            # stray text. <meta> is searched in the whole document for the
+            # same reason.
+            or first(_HEAD_TITLE_XPATH(root))
+            or first(_TITLE_XPATH(root))
         ),
-        "lang": (locale_to_lang(res.xpath("/html/@lang").get()) or None),
+        "lang": _get_lang(root),
         "site_name": (og.get("og:site_name") or dig(ld, "publisher", "name")),
         "kind": (og.get("og:type") or og.get("@type") or ld.get("@type")),
         "author": (
             author
             or og.get("og:author")
-            or dig(ld, "author", "name")
-            or dig(ld, "author", 0, "name")
+            or ld_author_name(ld)
         ),
         "modified_time": str_to_isoformat(
             og.get("article:modified_time") or ld.get("dateModified")
@@ -151,16 +337,33 @@ def get_metadata(res: Response) -> dict:
 def count_xml_character(xml_string: str) -> int:
     """
     Count characters in XML string, excluding spaces (not words).
+
+    The text is collected from the parsed tree in one pass, without a list of
+    text nodes.
     """
-    import re
+    sel = Selector(text=xml_string, type="xml")
+    return count_element_character(sel.root)
 
-    from scrapy import Selector
 
-    sel = Selector(text=xml_string, type="xml")
-    texts = sel.xpath("//text()").getall()
-    full_text = "".join(texts)
-    clean_text = re.sub(r"\s+", "", full_text)
-    return len(clean_text)
+def count_element_character(element: etree._Element) -> int:
+    """
+    Count characters in an XML element, excluding spaces (not words). Same as
+    count_xml_character(), but counts the parsed tree without serializing
+    it.
+    """
+    # str.split() removes the same whitespaces as r"\s+" does, and is faster
+    # than re.sub() or str.translate() with a table.
+    return len("".join(_STRING_XPATH(element).split()))
+
+
+@lru_cache(maxsize=256)
+def _get_filename_sanitizer(max_len: int) -> FileNameSanitizer:
+    """
+    Returns a FileNameSanitizer for `max_len`. Same as sanitize_filename(),
+    but the sanitizer, and its validator, are created once for each length
+    instead of every call.
+    """
+    return FileNameSanitizer(max_len=max_len)
 
 
 def generate_hashed_filename(
@@ -185,12 +388,6 @@ def generate_hashed_filename(
         url_size: The size of URL hash characters.
         max_len: Max allowed bytes in file names. Defaults to 255.
     """
-    import os
-    from hashlib import shake_128
-    from urllib.parse import unquote, urlparse
-
-    from pathvalidate import sanitize_filename
-
     parsed = urlparse(url)
     domain = parsed.netloc
 
@@ -198,16 +395,15 @@ def generate_hashed_filename(
     basename = os.path.basename(raw_path) or "index"
 
     root, ext = os.path.splitext(basename)
-    ext = sanitize_filename(
-        filename=ext,
-        max_len=10,
-    )
+    ext = _get_filename_sanitizer(10).sanitize(ext)
 
     domain_hash = shake_128(domain.encode()).hexdigest(domain_size // 2)
     url_hash = shake_128(url.encode()).hexdigest(url_size // 2)
 
     prefix = f"{domain_hash}-{url_hash}-"
-    prefix_len = len(prefix.encode("utf-8"))
+    # the prefix is ASCII, hex digits and "-", so the number of characters is
+    # the number of bytes. ext may have non-ASCII characters.
+    prefix_len = len(prefix)
     ext_len = len(ext.encode("utf-8"))
     allowed_max_len_for_root = max_len - prefix_len - ext_len
     if allowed_max_len_for_root <= 0:
@@ -219,33 +415,87 @@ def generate_hashed_filename(
             f"url_size: {url_size}\n"
         )
 
-    root = sanitize_filename(
-        filename=root,
-        max_len=allowed_max_len_for_root,
-    )
+    root = _get_filename_sanitizer(allowed_max_len_for_root).sanitize(root)
     return f"{prefix}{root}{ext}"
 
 
-def is_path_matched(url: str, regexp: str) -> bool:
+@lru_cache(maxsize=4096)
+def _get_unquoted_path(url: str) -> str:
+    """
+    Returns the unquoted path of the URL, or "/" when the URL has no path.
+    The results are cached, as a URL is parsed for is_file_url() and
+    is_path_matched() in a row.
+    """
+    parsed_path = urlparse(url).path
+    return unquote(parsed_path) if parsed_path else "/"
+
+
+def is_path_matched(url: str, regexp: str | re.Pattern) -> bool:
+    """
+    Returns bool whether if the path of the URL matches `regexp`. `regexp` is
+    either a string or a compiled pattern. Pass a compiled pattern when the
+    same pattern is matched against many URLs.
+    """
     if not url or not regexp:
         return False
 
-    import re
-    from urllib.parse import unquote, urlparse
-
-    parsed_path = urlparse(url).path
-    path = unquote(parsed_path) if parsed_path else "/"
+    path = _get_unquoted_path(url)
 
+    if isinstance(regexp, re.Pattern):
+        return bool(regexp.search(path))
     return bool(re.search(regexp, path))
 
 
+@lru_cache(maxsize=4096)
 def is_file_url(
-    url: str, regexp: str = r"(?:/|\.html?|\.php|\.aspx?|/[^./]+)$"
+    url: str, regexp: str | re.Pattern = FILE_URL_PATTERN
 ) -> bool:
     """
     Returns bool whether if the givne url is a URL to a file, not HTML page.
+    The results are cached, as the same links are found in many pages of a
+    site, e.g., in the navigation.
     """
     if not url:
         return False
 
     return not is_path_matched(url, regexp)
+
+
+def compile_router(
+    patterns: list[list[str]], group_prefix: str
+) -> re.Pattern | None:
+    """
+    Combine lists of patterns into a single pattern so that a string is
+    routed with one match instead of one search per pattern.
+
+    `patterns[i]` is the list of patterns of the i-th route. Each route
+    becomes a lookahead of its patterns followed by an empty group named
+    `<group_prefix><i>`. The alternatives are tried in the order of routes,
+    so the first route that matches anywhere in the string wins, as it does
+    when the routes are searched one by one. The name of the group is
+    `Match.lastgroup`. Routes without patterns never match.
+
+    Returns None when the patterns cannot be combined, e.g., a pattern has
+    global inline flags, duplicated group names, or numbered
+    backreferences. The caller should search the routes one by one then.
+    """
+    alternatives = []
+    for i, route_patterns in enumerate(patterns):
+        if not route_patterns:
+            continue
+        for pattern in route_patterns:
+            # group numbers are shifted in the combined pattern.
+            if re.search(r"\\[1-9]", pattern):
+                return None
+        any_pattern = "|".join(f"(?:{p})" for p in route_patterns)
+        # (?s:) lets the prefix skip any character without changing the
+        # meaning of "." in the patterns.
+        alternatives.append(
+            f"(?=(?s:.*?)(?:{any_pattern}))(?P<{group_prefix}{i}>)"
+        )
+    if not alternatives:
+        return None
+    try:
+        return re.compile("|".join(alternatives))
+    except re.error:
+        return None
@@ -1,6 +1,21 @@
+import os
+import re
+
 import pytest
 
-from bin.rss_reader import group_urls_to_commands
+from bin.rss_reader import (
+    compile_rules,
+    compile_url_router,
+    get_unread_entries,
+    group_urls_to_commands,
+    mark_entries_as_read,
+    next_interval,
+    parse_args,
+    publish_files,
+    run_spiders,
+    tmp_file_name,
+    with_jitter,
+)
 
 
 @pytest.fixture
@@ -50,3 +65,250 @@ def test_empty_input(config):
 def test_no_matching_urls(config):
     urls = ["https://google.com", "https://github.com"]
     assert group_urls_to_commands(urls, config) == []
+
+
+def test_compiled_rules_grouping(config):
+    unread_urls = [
+        "https://news.yahoo.co.jp/a",
+        "https://www.bbc.com/c",
+    ]
+
+    cmds = group_urls_to_commands(unread_urls, compile_rules(config))
+
+    assert len(cmds) == 2
+    assert all(
+        isinstance(rule["url_regexp"], re.Pattern) for rule in config["rules"]
+    )
+    assert config["rules"][0]["cmd_prefix"] == [
+        "scrapy",
+        "crawl",
+        "read-more",
+        "-a",
+        "site=yahoo",
+    ]
+
+
+def test_commands_do_not_share_prefix(config):
+    compile_rules(config)
+    unread_urls = ["https://news.yahoo.co.jp/a"]
+    cmd = group_urls_to_commands(unread_urls, config)[0]
+    cmd.extend(["-O", "foo.jsonl"])
+
+    assert "-O" not in config["rules"][0]["cmd_prefix"]
+    assert "-O" not in group_urls_to_commands(unread_urls, config)[0]
+
+
+@pytest.mark.parametrize(
+    "url, expected_index",
+    [
+        ("https://news.yahoo.co.jp/a", 0),
+        ("https://www.bbc.com/c", 1),
+        # the first rule wins even when the later rule matches earlier in
+        # the URL.
+        ("https://www.bbc.com/?ref=news.yahoo.co.jp", 0),
+        ("https://google.com", None),
+    ],
+)
+def test_url_router_matches_rules_in_order(config, url, expected_index):
+    router = compile_url_router(config["rules"])
+    m = router.match(url)
+
+    if expected_index is None:
+        assert m is None
+    else:
+        assert m.lastgroup == f"rule_{expected_index}"
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        r"(?i)bbc\.com",
+        r"(bbc)\.\1",
+    ],
+)
+def test_url_router_is_none_when_patterns_cannot_be_combined(pattern):
+    assert compile_url_router([{"url_pattern": pattern}]) is None
+
+
+def test_grouping_without_router(config):
+    config["rules"][1]["url_pattern"] = r"(?i)BBC\.com"
+    cmds = group_urls_to_commands(["https://www.bbc.com/c"], config)
+
+    assert len(cmds) == 1
+    assert "site=bbc" in cmds[0]
+
+
+@pytest.mark.parametrize("with_router", [True, False])
+def test_dot_in_url_pattern_does_not_match_newline(with_router):
+    pattern = r"example\.org/a.b" if with_router else r"(?i)example\.org/a.b"
+    config = compile_rules({"rules": [{"url_pattern": pattern}]})
+
+    assert (config["url_router"] is not None) == with_router
+    assert group_urls_to_commands(["https://example.org/a-b"], config)
+    assert not group_urls_to_commands(["https://example.org/a\nb"], config)
+
+
+def test_mark_entries_as_read(mocker):
+    reader = mocker.Mock()
+    entry_ids = [
+        ("https://example.org/feed", "1"),
+        ("https://example.org/feed", "2"),
+    ]
+    mark_entries_as_read(reader, entry_ids)
+
+    calls = reader.set_entry_read.call_args_list
+    assert [c.args[0] for c in calls] == entry_ids
+    assert all(c.args[1] is True for c in calls)
+    # all the entries share the same modified time
+    assert len({c.args[2] for c in calls}) == 1
+
+
+@pytest.mark.parametrize(
+    "current, has_entries, expected",
+    [
+        # reset to base when entries are found
+        (300, True, 60),
+        (60, False, 90),
+        (90, False, 135),
+        # capped at 4 times of base
+        (200, False, 240),
+        (240, False, 240),
+    ],
+)
+def test_next_interval(current, has_entries, expected):
+    assert next_interval(current, 60, has_entries) == expected
+
+
+def test_with_jitter():
+    assert all(90 <= with_jitter(100) <= 110 for _ in range(100))
+
+
+def test_run_spiders_runs_all_commands(mocker):
+    run_spider = mocker.patch("bin.rss_reader.run_spider")
+    commands = [["scrapy", "crawl", "foo"], ["scrapy", "crawl", "bar"]]
+    run_spiders(commands, max_workers=2)
+
+    assert sorted(c.args[0] for c in run_spider.call_args_list) == sorted(
+        commands
+    )
+
+
+def test_run_spiders_continues_on_error(mocker):
+    run_spider = mocker.patch(
+        "bin.rss_reader.run_spider", side_effect=[OSError("foo"), None]
+    )
+    commands = [["scrapy", "crawl", "foo"], ["scrapy", "crawl", "bar"]]
+    run_spiders(commands, max_workers=1)
+
+    assert run_spider.call_count == 2
+
+
+class TestPublishFiles:
+    def test_concatenates_parts(self, tmp_path):
+        parts = []
+        for i, content in enumerate([b"a\n", b"", b"b\n"]):
+            part = tmp_path / f"{i}.tmp"
+            part.write_bytes(content)
+            parts.append(str(part))
+        path = tmp_path / "out.jsonl"
+
+        assert publish_files(parts, str(path))
+        assert path.read_bytes() == b"a\nb\n"
+        assert not any(os.path.exists(part) for part in parts)
+
+    def test_ignores_missing_parts(self, tmp_path):
+        part = tmp_path / "0.tmp"
+        part.write_bytes(b"a\n")
+        path = tmp_path / "out.jsonl"
+
+        assert publish_files([str(tmp_path / "missing"), str(part)], str(path))
+        assert path.read_bytes() == b"a\n"
+
+    def test_does_not_create_empty_file(self, tmp_path):
+        part = tmp_path / "0.tmp"
+        part.write_bytes(b"")
+        path = tmp_path / "out.jsonl"
+
+        assert not publish_files([str(part)], str(path))
+        assert not path.exists()
+        assert not part.exists()
+
+
+def test_urls_are_split_into_batches(config):
+    config["rules"][0]["batch_size"] = 2
+    unread_urls = [f"https://news.yahoo.co.jp/{i}" for i in range(5)]
+
+    cmds = group_urls_to_commands(unread_urls, config)
+
+    assert len(cmds) == 3
+    assert "urls=https://news.yahoo.co.jp/4" in cmds[2]
+    assert all(cmd[0:3] == ["scrapy", "crawl", "read-more"] for cmd in cmds)
+
+
+@pytest.mark.parametrize("batch_size", [0, -1, "10", 1.5, True])
+def test_invalid_batch_size(config, batch_size):
+    config["rules"][1]["batch_size"] = batch_size
+
+    with pytest.raises(ValueError, match="batch_size .* in rule 'BBC'"):
+        compile_rules(config)
+
+
+@pytest.mark.parametrize("with_router", [True, False])
+def test_url_patterns_match_non_ascii(with_router):
+    pattern = r"example\.org/\w+$" if with_router else r"(?i)example\.org/\w+$"
+    config = compile_rules({"rules": [{"url_pattern": pattern}]})
+
+    assert group_urls_to_commands(["https://example.org/foo"], config)
+    assert group_urls_to_commands(["https://example.org/日本"], config)
+
+
+def test_duplicated_urls_are_removed(config):
+    unread_urls = [
+        "https://news.yahoo.co.jp/a",
+        "https://news.yahoo.co.jp/b",
+        "https://news.yahoo.co.jp/a",
+    ]
+
+    cmds = group_urls_to_commands(unread_urls, config)
+
+    assert "urls=https://news.yahoo.co.jp/a,https://news.yahoo.co.jp/b" in (
+        cmds[0]
+    )
+
+
+def test_get_unread_entries(mocker):
+    feed_url = "https://example.org/feed"
+    reader = mocker.Mock()
+    reader.get_entries.return_value = iter(
+        [
+            mocker.Mock(feed_url=feed_url, id="1", link="a"),
+            mocker.Mock(feed_url=feed_url, id="2", link=None),
+        ]
+    )
+    entry_ids, links = get_unread_entries(reader)
+
+    reader.get_entries.assert_called_once_with(read=False)
+    assert entry_ids == [(feed_url, "1"), (feed_url, "2")]
+    assert links == ["a"]
+
+
+def test_tmp_file_name_keeps_extension():
+    assert tmp_file_name("out/rss-1.jsonl", 2) == "out/rss-1-2.tmp.jsonl"
+
+
+class TestParseArgs:
+    def test_defaults(self):
+        args = parse_args([])
+
+        assert args.loglevel == "INFO"
+        assert args.interval == 15
+
+    def test_loglevel_in_lower_case(self):
+        assert parse_args(["-l", "debug"]).loglevel == "DEBUG"
+
+    def test_interval_is_a_number(self):
+        assert parse_args(["-i", "5"]).interval * 60 == 300
+
+    def test_invalid_loglevel(self):
+        with pytest.raises(SystemExit):
+            parse_args(["-l", "foo"])
@@ -0,0 +1,99 @@
+import scrapy
+from scrapy.http import HtmlResponse
+
+from generic.spiders.archive_spider import ArchiveSpider
+
+
+class TestArchiveSpider:
+    class TestParseArchiveIndex:
+        def test_yields_articles_and_next_archive(self):
+            spider = ArchiveSpider(
+                urls="http://example.org/archive",
+                archive_article_xpath="//ul[@id='articles']//a/@href",
+                archive_next_xpath="//a[@rel='next']/@href",
+            )
+            body = """
+            <html>
+              <body>
+                <ul id="articles">
+                  <li><a href="/a.html">A</a></li>
+                  <li><a href="/b.html">B</a></li>
+                </ul>
+                <a rel="next" href="?page=2">Next</a>
+              </body>
+            </html>
+            """
+            response = HtmlResponse(
+                url="http://example.org/archive", body=body, encoding="utf-8"
+            )
+
+            requests = list(spider.parse_archive_index(response))
+
+            assert all(isinstance(r, scrapy.Request) for r in requests)
+            assert [r.url for r in requests] == [
+                "http://example.org/a.html",
+                "http://example.org/b.html",
+                "http://example.org/archive?page=2",
+            ]
+            assert requests[0].callback == spider.parse_article
+            assert requests[-1].callback == spider.parse_archive_index
+
+        def test_without_next_archive(self):
+            spider = ArchiveSpider(
+                urls="http://example.org/archive",
+                archive_article_xpath="//a/@href",
+                archive_next_xpath="//a[@rel='next']/@href",
+            )
+            response = HtmlResponse(
+                url="http://example.org/archive",
+                body='<a href="/a.html">A</a>',
+                encoding="utf-8",
+            )
+
+            requests = list(spider.parse_archive_index(response))
+
+            assert [r.url for r in requests] == ["http://example.org/a.html"]
+
+        def test_with_exslt_extensions(self):
+            spider = ArchiveSpider(
+                urls="http://example.org/archive",
+                archive_article_xpath=r"//a[re:test(@href,'a\d')]/@href",
+                archive_next_xpath="//a[re:test(@rel,'^next$')]/@href",
+            )
+            response = HtmlResponse(
+                url="http://example.org/archive",
+                body=(
+                    '<a href="/a1">A</a><a href="/b1">B</a>'
+                    '<a rel="next" href="?page=2">Next</a>'
+                ),
+                encoding="utf-8",
+            )
+
+            requests = list(spider.parse_archive_index(response))
+
+            assert [r.url for r in requests] == [
+                "http://example.org/a1",
+                "http://example.org/archive?page=2",
+            ]
+
+        def test_with_scalar_results(self):
+            spider = ArchiveSpider(
+                urls="http://example.org/archive",
+                archive_article_xpath="string(//ul/li/a/@href)",
+                archive_next_xpath="string(//a[@rel='next']/@href)",
+            )
+            response = HtmlResponse(
+                url="http://example.org/archive",
+                body=(
+                    '<ul><li><a href="/a1">A</a></li></ul>'
+                    '<a rel="next" href="/page/2">Next</a>'
+                ),
+                encoding="utf-8",
+            )
+
+            requests = list(spider.parse_archive_index(response))
+
+            assert [r.url for r in requests] == [
+                "http://example.org/a1",
+                "http://example.org/page/2",
+            ]
@@ -120,6 +120,16 @@ class TestGenericSpider:
 
         assert "xn--wgv71a119e.example.org" in spider.allowed_domains
 
+    def test_allowed_domains_are_unique_in_order(self, spider_cls):
+        urls = [
+            "http://b.example.org/1",
+            "http://a.example.org/",
+            "http://b.example.org/2",
+        ]
+        spider = spider_cls(urls=urls)
+
+        assert spider.allowed_domains == ["b.example.org", "a.example.org"]
+
     def test_accepts_empty_urls(self, spider_cls):
         urls = []
         spider = spider_cls(urls=urls)
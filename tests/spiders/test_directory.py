@@ -0,0 +1,53 @@
+import pytest
+from scrapy.http import HtmlResponse
+
+from generic.spiders.directory import DirectorySpider
+
+
+class TestDirectorySpider:
+    @pytest.mark.parametrize(
+        "url, allowed, denied",
+        [
+            (
+                "http://example.org/a/b/c.html",
+                [
+                    "http://example.org/a/b/foo.html",
+                    "https://example.org/a/b/",
+                    "http://example.org/a/b/10.pdf.html",
+                ],
+                [
+                    "http://example.org/index.html",
+                    "http://example.org/a/index.html",
+                    "http://example.org/a/b/doc.pdf",
+                    "http://example.org/a/b/doc.DOCX?download=1",
+                ],
+            ),
+            (
+                "http://example.org/",
+                ["http://example.org/foo.html"],
+                [
+                    "http://example.net/foo.html",
+                    "http://example.org.example.net/foo.html",
+                ],
+            ),
+        ],
+    )
+    def test_rules(self, url, allowed, denied):
+        spider = DirectorySpider(url=url)
+        body = "".join(f'<a href="{h}">link</a>' for h in allowed + denied)
+        response = HtmlResponse(url=url, body=body, encoding="utf-8")
+
+        rule = spider._rules[0]
+        links = rule.process_links(rule.link_extractor.extract_links(response))
+
+        assert [link.url for link in links] == allowed
+
+    def test_rules_are_shared_by_instances(self):
+        first = DirectorySpider(url="http://example.org/a/b.html")
+        second = DirectorySpider(url="http://example.org/a/c.html")
+        other = DirectorySpider(url="http://example.org/b/c.html")
+
+        assert first.rules is second.rules
+        assert first.rules is not other.rules
+        # rules are bound to each instance.
+        assert first._rules[0] is not second._rules[0]
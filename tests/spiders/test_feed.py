@@ -0,0 +1,167 @@
+import os
+
+import pytest
+from scrapy.http import HtmlResponse
+
+from generic.spiders.feed import Feed, FeedEntry, FeedSpider
+
+
+class TestFeedSpider:
+    def test_loads_config(self, tmp_path):
+        path = tmp_path / "feed.yml"
+        path.write_text(
+            """
+---
+feed_config:
+  "http://example.org/latest.html":
+    file_name: "latest.xml"
+    xpath_href: "//li/a/@href"
+    xpath_title: "//li/a/text()"
+""",
+            encoding="utf-8",
+        )
+
+        spider = FeedSpider(config=str(path))
+
+        config = spider.args.feed_config["http://example.org/latest.html"]
+        assert config.file_name == "latest.xml"
+        assert config.feed_type == "atom"
+        assert config.pretty is False
+        assert spider.args.config == path
+
+    def test_config_is_cached_until_modified(self, tmp_path):
+        path = tmp_path / "feed.yml"
+        path.write_text(
+            """
+---
+feed_config:
+  "http://example.org/latest.html":
+    file_name: "latest.xml"
+    xpath_href: "//li/a/@href"
+    xpath_title: "//li/a/text()"
+""",
+            encoding="utf-8",
+        )
+
+        first = FeedSpider(config=str(path))
+        second = FeedSpider(config=str(path))
+        assert first.args is second.args
+
+        path.write_text("---\nfeed_config: {}\n", encoding="utf-8")
+        os.utime(path, ns=(0, 0))
+        third = FeedSpider(config=str(path))
+        assert third.args.feed_config == {}
+
+    @pytest.mark.parametrize("pretty", [True, False])
+    def test_generate_atom_feed(self, tmp_path, pretty):
+        path = tmp_path / "feed.yml"
+        path.write_text("---\nfeed_config: {}\n", encoding="utf-8")
+        spider = FeedSpider(config=str(path))
+        url = "http://example.org/latest.html"
+        feed = Feed(id=url, lang="ja", type="atom", title="Latest")
+        entries = [
+            FeedEntry(
+                id="http://example.org/a.html",
+                title="A",
+                link="http://example.org/a.html",
+            )
+        ]
+
+        item = spider._generate_feed(
+            url=url,
+            feed=feed,
+            feed_entries=entries,
+            file_name="latest.xml",
+            pretty=pretty,
+        )
+
+        assert item.file_name == "latest.xml"
+        assert "http://example.org/a.html" in item.content
+        assert ("\n  <" in item.content) is pretty
+
+    def test_parse_yields_feed_of_links(self, tmp_path):
+        path = tmp_path / "feed.yml"
+        path.write_text(
+            """
+---
+feed_config:
+  "http://example.org/latest.html":
+    file_name: "latest.xml"
+    xpath_href: "//li/a/@href"
+    xpath_title: "//li/a/text()"
+""",
+            encoding="utf-8",
+        )
+        spider = FeedSpider(config=str(path))
+        body = """
+        <html lang="ja">
+          <head><title>Latest</title></head>
+          <body>
+            <ul>
+              <li><a href="./a.html"> A </a></li>
+              <li><a href="./b.html">B</a></li>
+            </ul>
+          </body>
+        </html>
+        """
+        response = HtmlResponse(
+            url="http://example.org/latest.html", body=body, encoding="utf-8"
+        )
+
+        items = list(spider.parse(response))
+
+        assert len(items) == 1
+        content = items[0].content
+        assert "<title>A</title>" in content
+        assert "http://example.org/a.html" in content
+        assert "http://example.org/b.html" in content
+
+    def test_parse_with_exslt_extensions(self, tmp_path):
+        path = tmp_path / "feed.yml"
+        path.write_text(
+            r"""
+---
+feed_config:
+  "http://example.org/latest.html":
+    file_name: "latest.xml"
+    xpath_href: '//a[re:test(@href, "a\d")]/@href'
+    xpath_title: '//a[re:test(@href, "a\d")]/text()'
+""",
+            encoding="utf-8",
+        )
+        spider = FeedSpider(config=str(path))
+        response = HtmlResponse(
+            url="http://example.org/latest.html",
+            body='<html><a href="/a1">A</a><a href="/b1">B</a></html>',
+            encoding="utf-8",
+        )
+
+        content = list(spider.parse(response))[0].content
+
+        assert "http://example.org/a1" in content
+        assert "http://example.org/b1" not in content
+
+    def test_parse_with_scalar_and_element_results(self, tmp_path):
+        path = tmp_path / "feed.yml"
+        path.write_text(
+            """
+---
+feed_config:
+  "http://example.org/latest.html":
+    file_name: "latest.xml"
+    xpath_href: "string(//li/a/@href)"
+    xpath_title: "//li/a/b"
+""",
+            encoding="utf-8",
+        )
+        spider = FeedSpider(config=str(path))
+        response = HtmlResponse(
+            url="http://example.org/latest.html",
+            body='<html><ul><li><a href="/a1"><b>A</b></a></li></ul></html>',
+            encoding="utf-8",
+        )
+
+        content = list(spider.parse(response))[0].content
+
+        assert "http://example.org/a1" in content
+        assert "&lt;b&gt;A&lt;/b&gt;" in content
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from scrapy.http import HtmlResponse
+
+from generic.spiders.file_download import FileDownloadSpider
+
+
+class TestFileDownloadSpider:
+    @pytest.fixture
+    def make_spider(self):
+        def _make(**kwargs):
+            if "urls" not in kwargs:
+                kwargs["urls"] = "http://example.org/"
+            return FileDownloadSpider(**kwargs)
+
+        return _make
+
+    class TestStart:
+        def test_yields_request_for_each_url(self, make_spider):
+            spider = make_spider(urls="http://example.org/a/,http://example.org/b/")
+
+            async def collect():
+                return [request async for request in spider.start()]
+
+            requests = asyncio.run(collect())
+
+            assert [r.url for r in requests] == [
+                "http://example.org/a/",
+                "http://example.org/b/",
+            ]
+            assert all(r.callback == spider.parse_page for r in requests)
+
+    class TestExtractFileDownloadHrefs:
+        def test_returns_absolute_urls_of_matched_files(self, make_spider):
+            body = """
+            <html>
+              <body>
+                <a href="./a.pdf">A</a>
+                <a href=" /foo/b.pdf ">B</a>
+                <a href="https://example.net/c.pdf">C</a>
+                <a href="./d.html">D</a>
+                <a href="">E</a>
+                <a>F</a>
+              </body>
+            </html>
+            """
+            response = HtmlResponse(
+                url="http://example.org/dir/", body=body, encoding="utf-8"
+            )
+            spider = make_spider()
+
+            assert spider.extract_file_download_hrefs(response) == [
+                "http://example.org/dir/a.pdf",
+                "http://example.org/foo/b.pdf",
+                "https://example.net/c.pdf",
+            ]
+
+        def test_file_regexp(self, make_spider):
+            body = '<a href="a.pdf">A</a><a href="b.docx">B</a>'
+            response = HtmlResponse(
+                url="http://example.org/", body=body, encoding="utf-8"
+            )
+            spider = make_spider(file_regexp=r"\.docx$")
+
+            assert spider.extract_file_download_hrefs(response) == [
+                "http://example.org/b.docx"
+            ]
+
+    class TestConfig:
+        def test_patterns_are_compiled_once(self, make_spider):
+            spider = make_spider(file_regexp=r"\.docx$", path_regexp=r"^/a/")
+
+            assert spider.args.file_pattern.pattern == r"\.docx$"
+            assert spider.args.file_pattern is spider.args.file_pattern
+            assert spider.args.path_pattern.pattern == r"^/a/"
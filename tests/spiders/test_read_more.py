@@ -1,7 +1,10 @@
+import pickle
+
 import pytest
 import scrapy
 from pytest_mock import MockerFixture
 from scrapy.http import HtmlResponse
+from scrapy.utils.request import request_from_dict
 
 from generic.items import ArticleItem
 from generic.spiders.read_more import ReadMoreSpider
@@ -125,6 +128,28 @@ class TestReadMoreSpider:
 
                 assert results[0].url == f"{url_default}xpath-article.html"
 
+            def test_yields_request_to_article_page_using_exslt(
+                self,
+                url_default,
+                html_template,
+                make_spider,
+            ):
+                body = html_template(
+                    """
+                    <a href="/b1">Skip Me</a>
+                    <a href="/a1">Pick Me</a>
+                    """
+                )
+                response = HtmlResponse(
+                    url=url_default, body=body, encoding="utf-8"
+                )
+                spider = make_spider(
+                    read_more_xpath=r"//a[re:test(@href,'a\d')]"
+                )
+                results = list(spider.parse(response))
+
+                assert [r.url for r in results] == ["http://example.org/a1"]
+
         class TestWhenReadMoreXpatAndReadMoresGiven:
             def test_read_more_is_ignored(
                 self,
@@ -173,6 +198,21 @@ class TestReadMoreSpider:
                 assert isinstance(request, scrapy.Request)
                 assert request.url == f"{url_default}article-001.html"
 
+    class TestFindLinks:
+        def test_does_not_search_without_options(
+            self, make_spider, html_template, url_default, mocker
+        ):
+            body = html_template('<a href="./p2.html">次へ</a>')
+            response = HtmlResponse(
+                url=url_default, body=body, encoding="utf-8"
+            )
+            spider = make_spider(read_more="", read_next="")
+            query = mocker.patch.object(spider, "_href_by_text_xpath")
+
+            assert spider._find_read_more_link(response) is None
+            assert spider._find_next_page_link(response) is None
+            query.assert_not_called()
+
     class TestParseArticle:
         class TestWhenItemIsNone:
             def test_parses_response_and_yields_request_to_next_page(
@@ -217,3 +257,344 @@ class TestReadMoreSpider:
                 # with collect args?
                 assert result.callback == spider.parse_article
                 assert result.cb_kwargs["item"] == inner_item
+
+    class TestFindSourceLinks:
+        @pytest.mark.parametrize(
+            "kwargs",
+            [
+                {"source_contains": "US版"},
+                {"source_parent_contains": "英語記事"},
+            ],
+        )
+        def test_returns_absolute_urls(
+            self, make_spider, html_template, url_default, kwargs
+        ):
+            body = html_template(
+                """
+                <main>
+                  <p>英語記事: <a href="./us.html">US版</a></p>
+                </main>
+                """
+            )
+            response = HtmlResponse(
+                url=url_default, body=body, encoding="utf-8"
+            )
+            spider = make_spider(**kwargs)
+
+            assert spider._find_source_links(response) == [
+                f"{url_default}us.html"
+            ]
+
+        def test_removes_duplicates_and_fragments(
+            self, make_spider, html_template, url_default
+        ):
+            body = html_template(
+                """
+                <main>
+                  <p><a href="./b.html#top">US版</a></p>
+                  <p><a href="./a.html">US版</a></p>
+                  <p><a href="./b.html">US版</a></p>
+                  <p><a href="./a.html#section">US版</a></p>
+                </main>
+                """
+            )
+            response = HtmlResponse(
+                url=url_default, body=body, encoding="utf-8"
+            )
+            spider = make_spider(source_contains="US版")
+
+            assert spider._find_source_links(response) == [
+                f"{url_default}b.html",
+                f"{url_default}a.html",
+            ]
+
+        def test_resolves_same_href_once(
+            self, make_spider, html_template, url_default, mocker
+        ):
+            body = html_template(
+                """
+                <main>
+                  <p><a href="./a.html">US版</a></p>
+                  <p><a href="./a.html">US版</a></p>
+                  <p><a href="./b.html">US版</a></p>
+                </main>
+                """
+            )
+            response = HtmlResponse(
+                url=url_default, body=body, encoding="utf-8"
+            )
+            spider = make_spider(source_contains="US版")
+            spy = mocker.patch(
+                "generic.mixins.read_more.get_absolute_url",
+                side_effect=lambda res, href: res.urljoin(href),
+            )
+
+            assert spider._find_source_links(response) == [
+                f"{url_default}a.html",
+                f"{url_default}b.html",
+            ]
+            assert spy.call_count == 2
+
+        def test_returns_none_without_source_options(
+            self, make_spider, html_template, url_default
+        ):
+            body = html_template('<a href="./us.html">US版</a>')
+            response = HtmlResponse(
+                url=url_default, body=body, encoding="utf-8"
+            )
+
+            assert make_spider()._find_source_links(response) is None
+
+    class TestMergeArticleBody:
+        @pytest.fixture
+        def make_article_response(self, html_template):
+            def _make(url: str, text: str) -> HtmlResponse:
+                body = html_template(
+                    f"""
+                    <main>
+                      <article>
+                        <p>{text}の最初の段落です。十分な長さのテキストを含んでいます。
+                        日本語の文章をここに書きます。</p>
+                        <p>{text}の二番目の段落です。さらに長いテキストを追加して、
+                        抽出されるようにします。</p>
+                      </article>
+                    </main>
+                    """
+                )
+                return HtmlResponse(url=url, body=body, encoding="utf-8")
+
+            return _make
+
+        def test_appends_next_page_to_main(
+            self, make_spider, make_article_response, url_default
+        ):
+            spider = make_spider()
+            first = make_article_response(url_default, "ページ1")
+            item = ArticleItem.from_response(first)
+            pages = [
+                "<main><p>ページ2</p></main>".encode("utf-8"),
+                "<main><p>ページ3</p></main>".encode("utf-8"),
+            ]
+
+            merged = spider._merge_article_body(item, pages)
+
+            assert merged.body.count("<main>") == 1
+            assert (
+                merged.body.index("ページ1")
+                < merged.body.index("ページ2")
+                < merged.body.index("ページ3")
+            )
+
+        def test_request_for_next_page_can_be_pickled(
+            self, make_spider, make_article_response, url_default
+        ):
+            spider = make_spider(read_next="次へ")
+            first = make_article_response(url_default, "ページ1")
+            second = make_article_response(f"{url_default}p2.html", "ページ2")
+            # a link to the third page.
+            body = second.text.replace(
+                "</main>", '</main><a href="p3.html">次へ</a>'
+            )
+            second = second.replace(body=body.encode("utf-8"))
+            item = ArticleItem.from_response(first)
+
+            request = next(spider.parse_article(second, item))
+
+            # requests are serialized to JOBDIR. no lxml tree in cb_kwargs.
+            assert request.cb_kwargs["item"] is item
+            pages = pickle.loads(pickle.dumps(request.cb_kwargs))["pages"]
+            assert len(pages) == 1
+            assert "ページ2" in pages[0].decode("utf-8")
+
+        def test_parse_article_merges_last_page(
+            self, make_spider, make_article_response, url_default
+        ):
+            spider = make_spider()
+            first = make_article_response(url_default, "ページ1")
+            second = make_article_response(f"{url_default}p2.html", "ページ2")
+            item = ArticleItem.from_response(first)
+            first_count = item.character_count
+
+            results = list(spider.parse_article(second, item))
+
+            assert results == [item]
+            assert item.body.count("<main>") == 1
+            assert item.body.index("ページ1") < item.body.index("ページ2")
+            assert item.character_count > first_count
+
+        def test_parse_article_merges_pages_at_last_page(
+            self, make_spider, make_article_response, url_default
+        ):
+            spider = make_spider(read_next="次へ")
+            first = make_article_response(url_default, "ページ1")
+            second = make_article_response(f"{url_default}p2.html", "ページ2")
+            third = make_article_response(f"{url_default}p3.html", "ページ3")
+            body = second.text.replace(
+                "</main>", '</main><a href="p3.html">次へ</a>'
+            )
+            second = second.replace(body=body.encode("utf-8"))
+            item = ArticleItem.from_response(first)
+            first_body = item.body
+
+            request = next(spider.parse_article(second, item))
+            # the body is replaced at the last page only.
+            assert item.body == first_body
+            results = list(spider.parse_article(third, **request.cb_kwargs))
+
+            assert results == [item]
+            assert item.body.count("<main>") == 1
+            assert (
+                item.body.index("ページ1")
+                < item.body.index("ページ2")
+                < item.body.index("ページ3")
+            )
+
+    class TestSources:
+        @pytest.fixture
+        def make_source_response(self, html_template):
+            def _make(url: str, text: str) -> HtmlResponse:
+                body = html_template(
+                    f"""
+                    <main>
+                      <article>
+                        <p>{text}の最初の段落です。十分な長さのテキストを含んでいます。
+                        日本語の文章をここに書きます。</p>
+                        <p>{text}の二番目の段落です。さらに長いテキストを追加して、
+                        抽出されるようにします。</p>
+                      </article>
+                    </main>
+                    """
+                )
+                return HtmlResponse(url=url, body=body, encoding="utf-8")
+
+            return _make
+
+        @pytest.fixture
+        def parent_item(self, url_default):
+            return ArticleItem(
+                url=url_default,
+                body="<main><p>text</p></main>",
+                acquired_time="now",
+                lang="ja",
+            )
+
+        def request_sources(self, spider, html_template, url_default, item):
+            body = html_template(
+                """
+                <main>
+                  <p><a href="./us-1.html">US版</a></p>
+                  <p><a href="./us-2.html">US版</a></p>
+                </main>
+                """
+            )
+            response = HtmlResponse(
+                url=url_default, body=body, encoding="utf-8"
+            )
+            return list(spider._find_and_request_sources(response, item))
+
+        def test_requests_all_sources_at_once(
+            self, make_spider, html_template, url_default, parent_item
+        ):
+            spider = make_spider(source_contains="US版")
+
+            requests = self.request_sources(
+                spider, html_template, url_default, parent_item
+            )
+
+            assert [r.url for r in requests] == [
+                f"{url_default}us-1.html",
+                f"{url_default}us-2.html",
+            ]
+            assert all(r.errback == spider._source_failed for r in requests)
+
+        def test_yields_parent_item_after_last_source(
+            self,
+            make_spider,
+            html_template,
+            url_default,
+            parent_item,
+            make_source_response,
+        ):
+            spider = make_spider(source_contains="US版")
+            first, second = self.request_sources(
+                spider, html_template, url_default, parent_item
+            )
+
+            # the second source finishes first.
+            results = list(
+                spider.parse_source_only(
+                    make_source_response(second.url, "ソース2"),
+                    **second.cb_kwargs,
+                )
+            )
+            assert results == []
+
+            results = list(
+                spider.parse_source_only(
+                    make_source_response(first.url, "ソース1"),
+                    **first.cb_kwargs,
+                )
+            )
+            assert results == [parent_item]
+            # sources are in the order of the links.
+            assert [s.url for s in parent_item.sources] == [
+                first.url,
+                second.url,
+            ]
+
+        def test_yields_parent_item_when_source_fails(
+            self,
+            make_spider,
+            html_template,
+            url_default,
+            parent_item,
+            make_source_response,
+            mocker: MockerFixture,
+        ):
+            spider = make_spider(source_contains="US版")
+            first, second = self.request_sources(
+                spider, html_template, url_default, parent_item
+            )
+
+            list(
+                spider.parse_source_only(
+                    make_source_response(first.url, "ソース1"),
+                    **first.cb_kwargs,
+                )
+            )
+            failure = mocker.Mock(request=second, value=TimeoutError())
+            results = list(spider._source_failed(failure))
+
+            assert results == [parent_item]
+            assert [s.url for s in parent_item.sources] == [first.url]
+
+        def test_yields_parent_item_once_after_serialization(
+            self,
+            make_spider,
+            html_template,
+            url_default,
+            parent_item,
+            make_source_response,
+        ):
+            spider = make_spider(source_contains="US版")
+            requests = [
+                # each request is serialized separately to JOBDIR.
+                request_from_dict(
+                    pickle.loads(pickle.dumps(r.to_dict(spider=spider))),
+                    spider=spider,
+                )
+                for r in self.request_sources(
+                    spider, html_template, url_default, parent_item
+                )
+            ]
+
+            results = [
+                result
+                for r in requests
+                for result in r.callback(
+                    make_source_response(r.url, "ソース"), **r.cb_kwargs
+                )
+            ]
+
+            assert results == [parent_item]
+            assert len(parent_item.sources) == 2
@@ -0,0 +1,86 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+
+import extruct
+import pytest
+import trafilatura
+from scrapy.http import HtmlResponse
+
+from generic.items import ArticleItem, article_item_from_body
+from generic.spiders.wordpress import WordPressSpider
+
+
+class TestWordPressSpider:
+    @pytest.fixture
+    def spider(self):
+        return WordPressSpider(urls="http://example.org/")
+
+    @pytest.fixture
+    def response(self):
+        body = """
+        <html lang="ja">
+          <head><title>タイトル</title></head>
+          <body>
+            <main>
+              <article>
+                <p>これは本文の最初の段落です。十分な長さのテキストを含んで
+                います。日本語の文章をここに書きます。</p>
+                <p>二番目の段落です。さらに長いテキストを追加して、抽出さ
+                れるようにします。</p>
+              </article>
+            </main>
+          </body>
+        </html>
+        """
+        return HtmlResponse(
+            url="http://example.org/a.html", body=body, encoding="utf-8"
+        )
+
+    async def collect(self, spider, response):
+        return [item async for item in spider.parse(response)]
+
+    def test_parse_without_pool(self, spider, response):
+        items = asyncio.run(self.collect(spider, response))
+
+        assert len(items) == 1
+        assert isinstance(items[0], ArticleItem)
+        assert items[0].url == response.url
+
+    def test_parse_in_pool(self, spider, response):
+        with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("forkserver"),
+        ) as pool:
+            spider._extract_pool = pool
+            items = asyncio.run(self.collect(spider, response))
+
+        expected = ArticleItem.from_response(response)
+        assert len(items) == 1
+        assert items[0].body == expected.body
+        assert items[0].url == expected.url
+
+    def test_parse_reuses_parsed_tree(self, mocker, spider, response):
+        root = response.selector.root
+        extract = mocker.patch(
+            "trafilatura.extract", wraps=trafilatura.extract
+        )
+        extruct_extract = mocker.patch(
+            "generic.utils.extruct.extract", wraps=extruct.extract
+        )
+
+        asyncio.run(self.collect(spider, response))
+
+        assert extract.call_args.args[0] is root
+        assert extruct_extract.call_args.args[0] is root
+
+    def test_pool_receives_body_as_bytes(self, mocker, spider, response):
+        future = Future()
+        future.set_result(ArticleItem.from_response(response))
+        spider._extract_pool = mocker.Mock(**{"submit.return_value": future})
+
+        asyncio.run(self.collect(spider, response))
+
+        spider._extract_pool.submit.assert_called_once_with(
+            article_item_from_body, response.url, response.body, "utf-8"
+        )
@@ -0,0 +1,81 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from scrapy import Request
+
+from generic.download_handlers import PersistentImpersonateDownloadHandler
+
+
+class TestPersistentImpersonateDownloadHandler:
+    @pytest.fixture
+    def handler(self):
+        # the constructor requires a running reactor. the session management
+        # does not.
+        handler = PersistentImpersonateDownloadHandler.__new__(
+            PersistentImpersonateDownloadHandler
+        )
+        handler.max_clients = 4
+        handler.sessions = {}
+        return handler
+
+    def test_reuses_session_for_same_curl_options(self, handler):
+        async def run():
+            first = handler.get_session({})
+            second = handler.get_session({})
+            other = handler.get_session({"proxy": "http://proxy"})
+            result = (first is second, first is other, len(handler.sessions))
+            for session in handler.sessions.values():
+                await session.close()
+            return result
+
+        assert asyncio.run(run()) == (True, False, 2)
+
+    def test_sessions_do_not_keep_cookies(self, handler):
+        async def run():
+            session = handler.get_session({})
+            discard_cookies = session.discard_cookies
+            await session.close()
+            return discard_cookies
+
+        assert asyncio.run(run()) is True
+
+    def test_reuses_connection_to_host(self, handler):
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            client_ports = []
+
+            def do_GET(self):
+                self.client_ports.append(self.client_address[1])
+                body = b"<html></html>"
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://127.0.0.1:{server.server_port}/"
+
+        async def run():
+            responses = [
+                await handler._download_request(Request(f"{url}{i}"))
+                for i in range(3)
+            ]
+            await handler.close_sessions()
+            return responses
+
+        try:
+            responses = asyncio.run(run())
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        assert [r.status for r in responses] == [200, 200, 200]
+        assert len(set(Handler.client_ports)) == 1
@@ -0,0 +1,172 @@
+import json
+
+import pytest
+from scrapy.http import HtmlResponse
+from scrapy.utils.serialize import ScrapyJSONEncoder
+
+from generic.items import ArticleItem, article_item_from_body
+
+
+@pytest.fixture
+def article_response():
+    body = """
+    <html lang="ja">
+      <head>
+        <title>テスト記事</title>
+        <meta property="og:title" content="OGタイトル">
+        <meta name="author" content="山田太郎">
+      </head>
+      <body>
+        <nav><a href="/">Home</a></nav>
+        <main>
+          <article>
+            <h1>見出し</h1>
+            <p>
+              これは本文の最初の段落です。十分な長さのテキストを含んでいます。
+              日本語の文章をここに書きます。
+            </p>
+            <p>
+              二番目の段落には<b>太字</b>があります。さらに長いテキストを
+              追加して、抽出されるようにします。
+            </p>
+            <p>三番目の段落。<a href="/next">次へ</a></p>
+          </article>
+        </main>
+      </body>
+    </html>
+    """
+    return HtmlResponse(
+        url="https://example.org/article", body=body, encoding="utf-8"
+    )
+
+
+class TestArticleItemFromResponse:
+    def test_creates_article_item(self, article_response):
+        item = ArticleItem.from_response(article_response)
+
+        assert item.title == "OGタイトル"
+        assert item.author == "山田太郎"
+        assert item.lang == "ja"
+        assert item.body.startswith("<main>")
+        assert "太字" in item.body
+        assert item.character_count > 0
+
+    def test_does_not_modify_response(self, article_response):
+        ArticleItem.from_response(article_response)
+
+        assert article_response.xpath("//a[text()='次へ']/@href").get() == (
+            "/next"
+        )
+
+    def test_body_keeps_headings(self, article_response):
+        item = ArticleItem.from_response(article_response)
+
+        assert '<head rend="h1">見出し</head>' in item.body
+
+
+class TestArticleItemSources:
+    def make_item(self, url="https://example.org/"):
+        return ArticleItem(
+            acquired_time="2025-01-01T00:00:00+00:00",
+            body="<main/>",
+            url=url,
+            lang="ja",
+        )
+
+    def test_append_source(self):
+        item = self.make_item()
+        other = self.make_item()
+        source = self.make_item("https://example.org/source")
+
+        item.sources.append(source)
+
+        assert item.sources == [source]
+        # the default list is not shared.
+        assert other.sources == []
+
+    def test_exported_as_list(self):
+        item = self.make_item()
+
+        exported = json.loads(ScrapyJSONEncoder().encode(item))
+
+        assert exported["sources"] == []
+
+
+class TestArticleItemFromBody:
+    def test_same_as_from_response(self, article_response):
+        item = article_item_from_body(
+            article_response.url,
+            article_response.body,
+            article_response.encoding,
+        )
+        expected = ArticleItem.from_response(article_response)
+
+        assert item.body == expected.body
+        assert item.title == expected.title
+        assert item.url == expected.url
+
+
+class TestArticleItemGetJsonLd:
+    @pytest.mark.parametrize(
+        "script, expected",
+        [
+            ('{"@type": "NewsArticle"}', {"@type": "NewsArticle"}),
+            ('[{"@type": "NewsArticle"}, {}]', {"@type": "NewsArticle"}),
+            ("[]", {}),
+            ("{invalid", {}),
+            ("", {}),
+            ("  \n  ", {}),
+        ],
+    )
+    def test_get_json_ld(self, script, expected):
+        body = f"""
+        <html>
+          <head>
+            <script type="application/ld+json">{script}</script>
+          </head>
+        </html>
+        """
+        response = HtmlResponse(
+            url="https://example.org", body=body, encoding="utf-8"
+        )
+
+        assert ArticleItem.get_json_ld(response) == expected
+
+    def test_returns_first_article_in_multiple_blocks(self):
+        body = """
+        <html>
+          <head>
+            <script type="application/ld+json">
+              {"@type": "BreadcrumbList"}
+            </script>
+            <script type="application/ld+json">{invalid</script>
+            <script type="application/ld+json">
+              [{"@type": "WebPage"}, {"@type": ["NewsArticle"], "a": 1}]
+            </script>
+          </head>
+        </html>
+        """
+        response = HtmlResponse(
+            url="https://example.org", body=body, encoding="utf-8"
+        )
+
+        assert ArticleItem.get_json_ld(response)["a"] == 1
+
+    def test_returns_first_object_when_no_article(self):
+        body = """
+        <html>
+          <head>
+            <script type="application/ld+json">
+              {"@type": "BreadcrumbList"}
+            </script>
+            <script type="application/ld+json">{"@type": "WebPage"}</script>
+          </head>
+        </html>
+        """
+        response = HtmlResponse(
+            url="https://example.org", body=body, encoding="utf-8"
+        )
+
+        assert ArticleItem.get_json_ld(response) == {
+            "@type": "BreadcrumbList"
+        }
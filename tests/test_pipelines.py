@@ -0,0 +1,214 @@
+import asyncio
+import io
+from unittest.mock import MagicMock
+
+import pikepdf
+import pytest
+from scrapy.exceptions import DropItem
+
+from generic.items import ArticleItem, FeedItem, FileItem
+from generic.pipelines import (
+    DropMissingTextPipeline,
+    FeedStoragePipeline,
+    FileItemPipeline,
+    FileItemStoragePipeline,
+)
+
+
+@pytest.fixture
+def pdf_content():
+    pdf = pikepdf.new()
+    pdf.add_blank_page()
+    pdf.add_blank_page()
+    stream = io.BytesIO()
+    pdf.save(stream)
+    return stream.getvalue()
+
+
+def make_article(body):
+    return ArticleItem(
+        acquired_time="2025-01-01T00:00:00+00:00",
+        body=body,
+        url="https://example.org/",
+        lang="ja",
+    )
+
+
+class TestDropMissingTextPipeline:
+    @pytest.mark.parametrize("body", [None, ""])
+    def test_drops_article_without_text(self, body):
+        with pytest.raises(DropItem):
+            DropMissingTextPipeline().process_item(make_article(body))
+
+    def test_passes_article_with_text(self):
+        item = make_article("text")
+        assert DropMissingTextPipeline().process_item(item) is item
+
+    def test_passes_other_items(self):
+        item = FileItem(content=b"content")
+        assert DropMissingTextPipeline().process_item(item) is item
+
+
+class TestFeedStoragePipeline:
+    def make_feed(self, path, content="<rss/>"):
+        return FeedItem(
+            file_name=str(path),
+            url="https://example.org/",
+            content=content,
+        )
+
+    def test_saves_feed(self, tmp_path):
+        path = tmp_path / "feed.xml"
+        item = self.make_feed(path)
+        result = asyncio.run(
+            FeedStoragePipeline(MagicMock()).process_item(item)
+        )
+
+        assert result is item
+        assert path.read_text(encoding="utf-8") == "<rss/>"
+
+    def test_drops_feed_without_content(self, tmp_path):
+        item = self.make_feed(tmp_path / "feed.xml", content="")
+        with pytest.raises(DropItem):
+            asyncio.run(FeedStoragePipeline(MagicMock()).process_item(item))
+
+    def test_drops_feed_that_cannot_be_saved(self, tmp_path):
+        item = self.make_feed(tmp_path / "missing" / "feed.xml")
+        with pytest.raises(DropItem):
+            asyncio.run(FeedStoragePipeline(MagicMock()).process_item(item))
+
+    def test_passes_other_items(self):
+        item = FileItem(content=b"content")
+        result = asyncio.run(
+            FeedStoragePipeline(MagicMock()).process_item(item)
+        )
+
+        assert result is item
+
+
+class TestFileItemPipeline:
+    class TestProcessPdfItem:
+        def test_adds_metadata(self, pdf_content):
+            item = FileItem(
+                content=pdf_content,
+                filename="report.pdf",
+                url="https://example.org/report.pdf",
+                metadata={
+                    "url": "https://example.org/",
+                    "title": "Title",
+                },
+            )
+            new_item = FileItemPipeline(MagicMock()).process_pdf_item(item)
+
+            with pikepdf.open(io.BytesIO(new_item["content"])) as pdf:
+                assert len(pdf.pages) == 2
+                assert (
+                    str(pdf.docinfo["/FileURL"])
+                    == "https://example.org/report.pdf"
+                )
+                assert str(pdf.docinfo["/OriginalFilename"]) == "report.pdf"
+                assert (
+                    str(pdf.docinfo["/SourceURL"]) == "https://example.org/"
+                )
+                assert str(pdf.docinfo["/SourceTitle"]) == "Title"
+
+        def test_drops_invalid_pdf(self):
+            item = FileItem(
+                content=b"not a pdf",
+                filename="report.pdf",
+                url="https://example.org/report.pdf",
+            )
+            with pytest.raises(DropItem):
+                FileItemPipeline(MagicMock()).process_pdf_item(item)
+
+    class TestProcessItem:
+        def test_replaces_filename_in_place(self):
+            content = b"content"
+            item = FileItem(
+                content=content,
+                filename="report.txt",
+                url="https://example.org/report.txt",
+            )
+            new_item = asyncio.run(
+                FileItemPipeline(MagicMock()).process_item(item)
+            )
+
+            assert new_item is item
+            assert new_item["content"] is content
+            assert new_item["filename"] != "report.txt"
+            assert new_item["filename"].endswith(".txt")
+
+        def test_processes_pdf(self, pdf_content):
+            item = FileItem(
+                content=pdf_content,
+                filename="REPORT.PDF",
+                url="https://example.org/report.pdf",
+            )
+            new_item = asyncio.run(
+                FileItemPipeline(MagicMock()).process_item(item)
+            )
+
+            with pikepdf.open(io.BytesIO(new_item["content"])) as pdf:
+                assert (
+                    str(pdf.docinfo["/FileURL"])
+                    == "https://example.org/report.pdf"
+                )
+
+        def test_drops_item_without_extension(self):
+            item = FileItem(
+                content=b"content",
+                filename="report",
+                url="https://example.org/report",
+            )
+            with pytest.raises(DropItem):
+                asyncio.run(
+                    FileItemPipeline(MagicMock()).process_item(item)
+                )
+
+
+class TestFileItemStoragePipeline:
+    def test_saves_file(self, tmp_path):
+        item = FileItem(
+            content=b"content",
+            filename="report.pdf",
+            output_dir=str(tmp_path),
+        )
+        result = asyncio.run(
+            FileItemStoragePipeline(MagicMock()).process_item(item)
+        )
+
+        assert result is item
+        assert (tmp_path / "report.pdf").read_bytes() == b"content"
+
+    def test_overwrites_file(self, tmp_path):
+        (tmp_path / "report.pdf").write_bytes(b"old content")
+        item = FileItem(
+            content=b"new",
+            filename="report.pdf",
+            output_dir=str(tmp_path),
+        )
+        asyncio.run(
+            FileItemStoragePipeline(MagicMock()).process_item(item)
+        )
+
+        assert (tmp_path / "report.pdf").read_bytes() == b"new"
+
+    def test_saves_large_file(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(FileItemStoragePipeline, "DONTNEED_MIN_SIZE", 1)
+        item = FileItem(
+            content=b"content",
+            filename="report.pdf",
+            output_dir=str(tmp_path),
+        )
+        asyncio.run(
+            FileItemStoragePipeline(MagicMock()).process_item(item)
+        )
+
+        assert (tmp_path / "report.pdf").read_bytes() == b"content"
+
+    def test_drops_item_without_output_dir(self):
+        item = FileItem(content=b"content", filename="report.pdf")
+        with pytest.raises(DropItem):
+            asyncio.run(
+                FileItemStoragePipeline(MagicMock()).process_item(item)
+            )
@@ -72,3 +72,67 @@ def test_specific_rule_match_first():
     spider, _ = resolver.resolve(url)
 
     assert spider == "specific"
+
+
+def test_route_compiles_patterns():
+    route = SpiderResolverRoute(
+        patterns=[r"/foo", r"/bar"],
+        spider_name="foo",
+    )
+
+    assert [p.pattern for p in route.compiled] == route.patterns
+    assert "compiled" not in repr(route)
+
+
+class TestCompileRouter:
+    def make_resolver(self, *patterns_list):
+        routes = [
+            SpiderResolverRoute(patterns=patterns, spider_name=f"spider{i}")
+            for i, patterns in enumerate(patterns_list)
+        ]
+        return SpiderResolver(SpiderResolverConfig(routes=routes))
+
+    def test_combines_routes(self):
+        resolver = self.make_resolver([r"/specific"], [r"/.*"])
+
+        assert resolver.router is not None
+        assert resolver.resolve("https://example.org/specific") == (
+            "spider0",
+            [],
+        )
+        assert resolver.resolve("https://example.org/other") == (
+            "spider1",
+            [],
+        )
+
+    def test_any_pattern_of_route_matches(self):
+        resolver = self.make_resolver([r"\.org/", r"\.net/"], [r"\.com/"])
+
+        assert resolver.resolve("https://example.net/")[0] == "spider0"
+        assert resolver.resolve("https://example.com/")[0] == "spider1"
+
+    def test_anchored_pattern(self):
+        resolver = self.make_resolver([r"^https://example\.org/"], [r"org"])
+
+        assert resolver.resolve("https://example.org/")[0] == "spider0"
+        assert resolver.resolve("http://example.org/")[0] == "spider1"
+
+    def test_raises_exception_when_no_match(self):
+        resolver = self.make_resolver([r"\.org/"])
+
+        with pytest.raises(SpiderResolverNoRouteError):
+            resolver.resolve("https://example.com/")
+
+    @pytest.mark.parametrize(
+        "patterns_list",
+        [
+            [[r"(a)\1"], [r"/"]],
+            [[r"(?P<name>a)"], [r"(?P<name>/)"]],
+            [[r"(?i)example"], [r"/"]],
+        ],
+    )
+    def test_falls_back_to_routes(self, patterns_list):
+        resolver = self.make_resolver(*patterns_list)
+
+        assert resolver.router is None
+        assert resolver.resolve("https://x.org/")[0] == "spider1"
@@ -1,12 +1,30 @@
 import os
+import re
+from unittest.mock import patch
 from urllib.parse import quote
 
 import pytest
+from lxml import etree
+from scrapy.http import HtmlResponse
 
 from generic.utils import (
+    XML_PARSER,
+    compile_router,
+    compile_xpath,
+    count_element_character,
+    count_xml_character,
     generate_hashed_filename,
+    get_absolute_url,
+    get_meta_contents,
+    get_meta_property,
+    get_metadata,
+    get_uniform_metadata,
+    get_url_without_fragment,
+    idn2ascii,
     is_file_url,
     is_path_matched,
+    str_to_isoformat,
+    xpath_result_to_strings,
 )
 
 
@@ -125,6 +143,12 @@ class TestIsPathMatched:
     def test_is_path_matched(self, url, regexp, expected):
         assert is_path_matched(url, regexp) == expected
 
+    def test_compiled_pattern(self):
+        pattern = re.compile(r"\.pdf$")
+
+        assert is_path_matched("https://example.org/a.pdf", pattern)
+        assert not is_path_matched("https://example.org/a.html", pattern)
+
 
 class TestIsFileUrl:
     @pytest.mark.parametrize(
@@ -140,3 +164,350 @@ class TestIsFileUrl:
     )
     def test_is_file_url(self, url, expected_is_file):
         assert is_file_url(url) == expected_is_file
+
+    def test_result_is_cached(self):
+        url = "https://example.org/cached.pdf"
+        is_file_url(url)
+        hits = is_file_url.cache_info().hits
+
+        assert is_file_url(url)
+        assert is_file_url.cache_info().hits == hits + 1
+
+
+class TestGetMetaContents:
+    def test_collects_property_and_name(self):
+        body = """
+        <html>
+          <head>
+            <meta property="og:title" content="Title">
+            <meta name="author" content="Author">
+            <meta name="author" content="Another Author">
+            <meta name="description">
+          </head>
+        </html>
+        """
+        response = HtmlResponse(
+            url="https://example.org", body=body, encoding="utf-8"
+        )
+        metas = get_meta_contents(response)
+
+        assert metas == {
+            ("property", "og:title"): "Title",
+            ("name", "author"): "Author",
+        }
+
+
+class TestGetMetaProperty:
+    @pytest.mark.parametrize(
+        "name, expected",
+        [
+            ("og:title", "Title"),
+            ("og:site_name", None),
+            ("it's", "Quoted"),
+        ],
+    )
+    def test_returns_first_content(self, name, expected):
+        body = """
+        <html>
+          <head>
+            <meta property="og:title" content="Title">
+            <meta property="og:title" content="Another Title">
+            <meta property="it's" content="Quoted">
+          </head>
+        </html>
+        """
+        response = HtmlResponse(
+            url="https://example.org", body=body, encoding="utf-8"
+        )
+
+        assert get_meta_property(response, name) == expected
+
+
+class TestGetMetadata:
+    def test_title_outside_head(self):
+        # the parser closes <head> at the stray text, and <title> is in
+        # <body>.
+        body = """
+        <html>
+          <head>stray<title>Page Title</title></head>
+          <body></body>
+        </html>
+        """
+        response = HtmlResponse(
+            url="https://example.org", body=body, encoding="utf-8"
+        )
+
+        assert get_metadata(response)["title"] == "Page Title"
+
+    def test_title_and_lang(self):
+        body = """
+        <html lang="ja-JP">
+          <head><title>Page Title</title></head>
+          <body></body>
+        </html>
+        """
+        response = HtmlResponse(
+            url="https://example.org", body=body, encoding="utf-8"
+        )
+        metadata = get_metadata(response)
+
+        assert metadata["title"] == "Page Title"
+        assert metadata["lang"] == "ja"
+
+    @pytest.mark.parametrize(
+        "author",
+        [
+            '{"@type": "Person", "name": "Author"}',
+            '[{"@type": "Person", "name": "Author"}, {"name": "Another"}]',
+        ],
+    )
+    def test_author_in_json_ld(self, author):
+        body = f"""
+        <html>
+          <head>
+            <script type="application/ld+json">
+              {{"@type": "NewsArticle", "author": {author}}}
+            </script>
+          </head>
+        </html>
+        """
+        response = HtmlResponse(
+            url="https://example.org", body=body, encoding="utf-8"
+        )
+
+        assert get_metadata(response)["author"] == "Author"
+
+    def test_json_ld_in_body_with_parsed_tree(self):
+        body = """
+        <html>
+          <head>
+            <meta property="og:title" content="Title">
+          </head>
+          <body>
+            <script type="application/ld+json">
+              {"@type": "NewsArticle", "datePublished": "2024-01-02"}
+            </script>
+          </body>
+        </html>
+        """
+        response = HtmlResponse(
+            url="https://example.org", body=body, encoding="utf-8"
+        )
+
+        with patch(
+            "generic.utils.get_uniform_metadata",
+            wraps=get_uniform_metadata,
+        ) as mock:
+            metadata = get_metadata(response)
+
+        assert mock.call_args.args[0] is response.selector.root
+        assert metadata["title"] == "Title"
+        assert metadata["published_time"] == "2024-01-02T00:00:00"
+
+    def test_metadata_is_cached_for_response(self):
+        body = """
+        <html>
+          <head>
+            <meta property="og:title" content="Title">
+          </head>
+        </html>
+        """
+        response = HtmlResponse(
+            url="https://example.org", body=body, encoding="utf-8"
+        )
+
+        with patch(
+            "generic.utils.get_uniform_metadata",
+            wraps=get_uniform_metadata,
+        ) as mock:
+            first = get_metadata(response)
+            first["title"] = "Modified"
+            second = get_metadata(response)
+
+        assert mock.call_count == 1
+        assert second["title"] == "Title"
+
+    def test_non_utf8_body(self):
+        body = """
+        <html>
+          <head>
+            <meta charset="shift_jis">
+            <meta property="og:title" content="日本語のタイトル">
+          </head>
+        </html>
+        """.encode("shift_jis")
+        response = HtmlResponse(url="https://example.org", body=body)
+
+        assert get_metadata(response)["title"] == "日本語のタイトル"
+
+
+class TestIdn2ascii:
+    def test_converts_idn_host(self):
+        url = "https://日本語.example/パス"
+
+        assert idn2ascii(url) == "https://xn--wgv71a119e.example/パス"
+
+    def test_result_is_cached(self):
+        url = "https://example.org/cached"
+        idn2ascii(url)
+        hits = idn2ascii.cache_info().hits
+
+        assert idn2ascii(url) == url
+        assert idn2ascii.cache_info().hits == hits + 1
+
+
+class TestGetUrlWithoutFragment:
+    @pytest.mark.parametrize(
+        "url, expected",
+        [
+            ("https://example.org/a.html#top", "https://example.org/a.html"),
+            ("https://example.org/a.html", "https://example.org/a.html"),
+            ("https://example.org/?q=1#top", "https://example.org/?q=1"),
+        ],
+    )
+    def test_removes_fragment(self, url, expected):
+        assert get_url_without_fragment(url) == expected
+
+
+class TestGetAbsoluteUrl:
+    @pytest.mark.parametrize(
+        "href, expected",
+        [
+            ("https://example.net/a.pdf", "https://example.net/a.pdf"),
+            ("http://example.net/a.pdf", "http://example.net/a.pdf"),
+            ("a.pdf", "https://example.org/foo/a.pdf"),
+            ("/a.pdf", "https://example.org/a.pdf"),
+            ("//example.net/a.pdf", "https://example.net/a.pdf"),
+        ],
+    )
+    def test_get_absolute_url(self, href, expected):
+        response = HtmlResponse(
+            url="https://example.org/foo/index.html",
+            body=b"<html></html>",
+            encoding="utf-8",
+        )
+        assert get_absolute_url(response, href) == expected
+
+
+class TestCountElementCharacter:
+    @pytest.mark.parametrize(
+        "xml",
+        [
+            "<main><p>本文 です。</p>\n<p>二 番目</p></main>",
+            "<main>前<p>a <b>b</b> c</p>後</main>",
+            "<main><p>a<!-- comment --></p></main>",
+            "<main/>",
+        ],
+    )
+    def test_same_as_count_xml_character(self, xml):
+        element = etree.fromstring(xml)
+
+        assert count_element_character(element) == count_xml_character(xml)
+
+
+class TestCountXmlCharacter:
+    def test_counts_text_without_spaces_and_comments(self):
+        xml = "<main><p>a b</p><!-- comment --><p>\n  日本</p></main>"
+
+        assert count_xml_character(xml) == 4
+
+    def test_excludes_unicode_spaces(self):
+        xml = "<main><p>日\u3000本\u00a0語\t</p></main>"
+
+        assert count_xml_character(xml) == 3
+
+
+class TestStrToIsoformat:
+    @pytest.mark.parametrize(
+        "string, expected",
+        [
+            ("2025-01-02T03:04:05+09:00", "2025-01-02T03:04:05+09:00"),
+            ("2025-01-02T03:04:05Z", "2025-01-02T03:04:05+00:00"),
+            ("2025-01-02", "2025-01-02T00:00:00"),
+            ("Thu, 02 Jan 2025 03:04:05 GMT", "2025-01-02T03:04:05+00:00"),
+            ("2025年1月2日", None),
+            ("invalid", None),
+            ("", None),
+            (None, None),
+        ],
+    )
+    def test_str_to_isoformat(self, string, expected):
+        assert str_to_isoformat(string) == expected
+
+
+class TestCompileXpath:
+    def test_returns_cached_expression(self):
+        query = compile_xpath("//a/@href")
+
+        assert query is compile_xpath("//a/@href")
+        assert query.path == "//a/@href"
+
+    def test_returns_plain_strings(self):
+        root = etree.fromstring('<p><a href="x">A</a></p>')
+
+        result = compile_xpath("//a/@href")(root)
+
+        assert result == ["x"]
+        assert type(result[0]) is str
+
+    def test_supports_exslt_extensions(self):
+        root = etree.fromstring(
+            '<p><a href="/a1">A</a><a href="/b1">B</a><a href="/a1">A</a></p>'
+        )
+
+        assert compile_xpath(r"//a[re:test(@href,'a\d')]/@href")(root) == [
+            "/a1",
+            "/a1",
+        ]
+        assert compile_xpath("count(set:distinct(//a/@href))")(root) == 2
+
+
+class TestXpathResultToStrings:
+    @pytest.mark.parametrize(
+        "path, expected",
+        [
+            ("//a/@href", ["/a1", "/b1"]),
+            ("string(//a/@href)", ["/a1"]),
+            ("count(//a)", ["2.0"]),
+            ("boolean(//a)", ["1"]),
+            ("//a[1]", ['<a href="/a1">A</a>']),
+            ("//b/@href", []),
+        ],
+    )
+    def test_returns_list_of_strings(self, path, expected):
+        root = etree.fromstring(
+            '<p><a href="/a1">A</a><a href="/b1">B</a></p>'
+        )
+
+        assert xpath_result_to_strings(compile_xpath(path)(root)) == expected
+
+
+class TestXmlParser:
+    def test_parses_deep_tree(self):
+        xml = "<main>" + "<div>" * 300 + "text" + "</div>" * 300 + "</main>"
+
+        main = etree.fromstring(xml.encode("utf-8"), XML_PARSER)
+
+        assert count_element_character(main) == 4
+
+
+class TestCompileRouter:
+    def test_first_route_wins(self):
+        patterns = [[r"a\.org"], [], [r"b\.org", r"c\.org"]]
+        router = compile_router(patterns, "r_")
+
+        assert router.match("https://c.org/?a.org").lastgroup == "r_0"
+        assert router.match("https://c.org/").lastgroup == "r_2"
+        assert router.match("https://d.org/") is None
+
+    def test_dot_does_not_match_newline(self):
+        router = compile_router([[r"a.b"]], "r_")
+
+        assert router.match("x/a-b")
+        assert router.match("x/a\nb") is None
+
+    @pytest.mark.parametrize(
+        "patterns", [[], [[]], [[r"(?i)a"]], [[r"(a)\1"]]]
+    )
+    def test_none_when_patterns_cannot_be_combined(self, patterns):
+        assert compile_router(patterns, "r_") is None